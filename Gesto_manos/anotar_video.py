@@ -0,0 +1,284 @@
+"""Anotación offline de videos grabados en paralelo.
+
+El video se divide en segmentos contiguos que se procesan en procesos
+separados, cada uno con su propio GestureRecognizer en modo VIDEO. Cada
+segmento empieza --warmup frames antes de su inicio real para que el
+seguimiento de manos llegue "caliente" al primer frame del segmento; esos
+frames de calentamiento no se escriben.
+
+Salidas:
+  - video anotado (landmarks + etiquetas de gestos)
+  - gestos por frame en JSONL (una línea por frame), NPZ columnar o
+    registro binario .lmlog (ver registro_landmarks.py)
+
+Uso:
+    python3 anotar_video.py sesion.mp4 -o sesion_anotada.mp4 --workers 4
+"""
+import os
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from eventos import GESTURE_IDS, HAND_IDS, UNKNOWN_GESTURE
+from registro_landmarks import LandmarkLogWriter
+
+
+def video_properties(path):
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"No se pudo abrir el video: {path}")
+    props = {
+        'frames': int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+        'fps': cap.get(cv2.CAP_PROP_FPS) or 30.0,
+        'width': int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+        'height': int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    }
+    if props['frames'] <= 0:
+        # Algunos contenedores no informan el número de frames: se cuentan
+        props['frames'] = count_frames(cap)
+    cap.release()
+    if props['frames'] <= 0:
+        raise RuntimeError(f"El video no tiene frames legibles: {path}")
+    return props
+
+
+def count_frames(cap):
+    """Cuenta los frames avanzando sin decodificarlos (grab) y rebobina"""
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    frames = 0
+    while cap.grab():
+        frames += 1
+    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+    return frames
+
+
+def split_segments(total_frames, workers):
+    """Divide [0, total_frames) en hasta `workers` rangos contiguos"""
+    workers = max(1, min(workers, total_frames))
+    bounds = np.linspace(0, total_frames, workers + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+
+
+def annotate_segment(task):
+    """Procesa un segmento en un proceso hijo y escribe sus archivos parciales"""
+    # Importar aquí para que cada proceso cree su propio runtime de MediaPipe
+    import mediapipe as mp
+    from gestos import create_recognizer, build_gesture_info, \
+        draw_landmarks_on_frame, draw_gesture_labels
+
+    (index, video_path, start, end, warmup, model_path, props,
+     part_video, part_data) = task
+
+    recognizer = create_recognizer(model_path)
+    cap = cv2.VideoCapture(video_path)
+    first = max(0, start - warmup)
+    cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+
+    writer = cv2.VideoWriter(part_video, cv2.VideoWriter_fourcc(*"mp4v"),
+                             props['fps'], (props['width'], props['height']))
+    frame_ms = 1000.0 / props['fps']
+    records = []
+
+    started = time.perf_counter()
+    processed = 0
+    for frame_idx in range(first, end):
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
+        result = recognizer.recognize_for_video(mp_image, int(frame_idx * frame_ms))
+
+        if frame_idx < start:
+            continue  # Frame de calentamiento: sólo alimenta el seguimiento
+
+        gesture_info = build_gesture_info(result)
+        draw_landmarks_on_frame(frame, result.hand_landmarks)
+        draw_gesture_labels(frame, gesture_info)
+        writer.write(frame)
+
+        records.append((frame_idx, int(frame_idx * frame_ms), gesture_info))
+        processed += 1
+    elapsed = time.perf_counter() - started
+
+    writer.release()
+    cap.release()
+    recognizer.close()
+
+    with open(part_data, "w", encoding="utf-8") as f:
+        for frame_idx, timestamp_ms, gesture_info in records:
+            hands = [{
+                'gesture': info['gesture'],
+                'hand': info['hand'],
+                'score': round(float(info['score']), 4),
+                'landmarks': np.round(info['landmarks'], 5).tolist()
+            } for info in gesture_info]
+            f.write(json.dumps({'frame': frame_idx, 'timestamp_ms': timestamp_ms,
+                                'hands': hands}) + "\n")
+
+    return {'index': index, 'start': start, 'end': end, 'frames': processed,
+            'warmup_frames': start - first, 'seconds': elapsed}
+
+
+def merge_videos(parts, output, props):
+    """Concatena los videos parciales en el orden de los segmentos.
+
+    Con ffmpeg se unen sin recodificar (demuxer concat con -c copy: todas las
+    partes tienen el mismo códec y tamaño); sin ffmpeg, o si falla, se
+    decodifican y se vuelven a codificar frame a frame con OpenCV.
+    """
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is not None:
+        list_path = os.path.join(os.path.dirname(os.path.abspath(parts[0])), "partes.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            for part in parts:
+                escaped = os.path.abspath(part).replace("'", "'\\''")
+                f.write(f"file '{escaped}'\n")
+        done = subprocess.run([ffmpeg, "-y", "-loglevel", "error", "-f", "concat", "-safe", "0",
+                               "-i", list_path, "-c", "copy", output])
+        if done.returncode == 0:
+            return
+        print("[MERGE] ffmpeg no pudo unir las partes; se recodifican con OpenCV")
+
+    writer = cv2.VideoWriter(output, cv2.VideoWriter_fourcc(*"mp4v"),
+                             props['fps'], (props['width'], props['height']))
+    for part in parts:
+        cap = cv2.VideoCapture(part)
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            writer.write(frame)
+        cap.release()
+    writer.release()
+
+
+def merge_jsonl(parts, output):
+    with open(output, "wb") as out:
+        for part in parts:
+            with open(part, "rb") as f:
+                shutil.copyfileobj(f, out)
+
+
+def jsonl_to_npz(jsonl_path, output):
+    """Convierte el JSONL de gestos en arrays columnares (una fila por mano)"""
+    frames, timestamps, gestures, hands, scores, landmarks = [], [], [], [], [], []
+    with open(jsonl_path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            for hand in record['hands']:
+                frames.append(record['frame'])
+                timestamps.append(record['timestamp_ms'])
+                gestures.append(GESTURE_IDS.get(hand['gesture'], UNKNOWN_GESTURE))
+                hands.append(HAND_IDS.get(hand['hand'], HAND_IDS["Desconocida"]))
+                scores.append(hand['score'])
+                landmarks.append(hand['landmarks'])
+    np.savez_compressed(
+        output,
+        frame=np.array(frames, dtype=np.int64),
+        timestamp_ms=np.array(timestamps, dtype=np.int64),
+        gesture=np.array(gestures, dtype=np.uint8),
+        hand=np.array(hands, dtype=np.uint8),
+        score=np.array(scores, dtype=np.float32),
+        landmarks=np.array(landmarks, dtype=np.float32).reshape(-1, 21, 3)
+    )
+
+
+def jsonl_to_lmlog(jsonl_path, output):
+    """Convierte el JSONL de gestos en un registro binario (timestamp = segundos del video)"""
+    writer = LandmarkLogWriter(output)
+    with open(jsonl_path, encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            for hand in record['hands']:
+                writer.append(record['timestamp_ms'] / 1000.0, hand['hand'], hand['gesture'],
+                              hand['score'], hand['landmarks'])
+    writer.close()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Anotación offline de videos con gestos")
+    parser.add_argument("video", help="Video de entrada")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Video anotado de salida (por defecto <video>_anotado.mp4)")
+    parser.add_argument("--data", default=None,
+                        help="Archivo de gestos por frame (.jsonl, .npz o .lmlog)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Número de procesos")
+    parser.add_argument("--warmup", type=int, default=15,
+                        help="Frames de calentamiento antes de cada segmento")
+    return parser.parse_args()
+
+
+def main():
+    from gestos import download_model
+
+    args = parse_args()
+    base, _ = os.path.splitext(args.video)
+    output = args.output or f"{base}_anotado.mp4"
+    data_path = args.data or f"{base}_gestos.jsonl"
+
+    try:
+        props = video_properties(args.video)
+    except RuntimeError as e:
+        raise SystemExit(f"[ERROR] {e}")
+    model_path = os.path.abspath(download_model())
+    segments = split_segments(props['frames'], args.workers)
+
+    print("=" * 60)
+    print(f"Video: {args.video} ({props['frames']} frames, {props['fps']:.1f} FPS, "
+          f"{props['width']}x{props['height']})")
+    print(f"Segmentos: {len(segments)} | Calentamiento: {args.warmup} frames")
+    print("=" * 60)
+
+    tmp_dir = tempfile.mkdtemp(prefix="anotar_video_")
+    tasks = [(i, args.video, start, end, args.warmup, model_path, props,
+              os.path.join(tmp_dir, f"part_{i:03d}.mp4"),
+              os.path.join(tmp_dir, f"part_{i:03d}.jsonl"))
+             for i, (start, end) in enumerate(segments)]
+
+    try:
+        started = time.perf_counter()
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=len(tasks), mp_context=context) as executor:
+            results = list(executor.map(annotate_segment, tasks))
+        processing_time = time.perf_counter() - started
+
+        merge_start = time.perf_counter()
+        merge_videos([t[7] for t in tasks], output, props)
+        jsonl_path = data_path if data_path.endswith(".jsonl") else os.path.join(tmp_dir, "gestos.jsonl")
+        merge_jsonl([t[8] for t in tasks], jsonl_path)
+        if data_path.endswith(".npz"):
+            jsonl_to_npz(jsonl_path, data_path)
+        elif data_path.endswith(".lmlog"):
+            jsonl_to_lmlog(jsonl_path, data_path)
+        merge_time = time.perf_counter() - merge_start
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    total_frames = sum(r['frames'] for r in results)
+    fps = total_frames / processing_time if processing_time > 0 else 0.0
+    for r in results:
+        seg_fps = (r['frames'] + r['warmup_frames']) / r['seconds'] if r['seconds'] > 0 else 0.0
+        print(f"  Segmento {r['index']}: frames {r['start']}-{r['end']} | "
+              f"{r['frames']} anotados + {r['warmup_frames']} calentamiento | {seg_fps:.1f} FPS")
+    print("=" * 60)
+    print(f"Frames anotados: {total_frames}")
+    print(f"Tiempo de procesamiento: {processing_time:.2f} s | Unión: {merge_time:.2f} s")
+    print(f"FPS totales: {fps:.1f} | FPS por proceso: {fps / max(len(results), 1):.1f}")
+    print(f"Video anotado: {output}")
+    print(f"Gestos por frame: {data_path}")
+    print("=" * 60)
+
+
+if __name__ == "__main__":
+    main()
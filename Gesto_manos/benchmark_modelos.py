@@ -0,0 +1,174 @@
+"""Benchmark de variantes del reconocedor sobre un clip grabado.
+
+Cada perfil combina un archivo de modelo (.task), num_hands, el umbral de
+confianza y la escala aplicada al frame antes de la inferencia. Todos los
+perfiles procesan exactamente los mismos frames (el clip se decodifica una
+sola vez) y se comparan contra un perfil de referencia:
+
+  - throughput: frames / tiempo total de inferencia
+  - latencia p50/p95 por frame
+  - coincidencia: fracción de frames con el mismo conjunto (mano, gesto)
+    que la referencia
+
+El resultado se guarda en JSON; `gestos.py --profile resultado.json
+--accuracy-floor 0.9` usa el perfil más rápido que cumpla el piso.
+
+Uso:
+    python3 benchmark_modelos.py clip.mp4 --models gesture_recognizer.task otro.task -o bench.json
+    python3 benchmark_modelos.py clip.mp4 --profiles perfiles.json -o bench.json
+"""
+import os
+import json
+import time
+import argparse
+import platform
+import itertools
+
+import cv2
+import numpy as np
+import mediapipe as mp
+
+from gestos import create_recognizer, build_gesture_info, download_model, select_profile
+
+DEFAULT_NUM_HANDS = (2, 1)
+DEFAULT_CONFIDENCES = (0.5, 0.7)
+DEFAULT_SCALES = (1.0, 0.75, 0.5)
+
+
+def load_clip(path, max_frames):
+    """Decodifica el clip una vez (en RGB) para no medir la decodificación"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"No se pudo abrir el clip: {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    cap.release()
+    return frames, fps
+
+
+def default_profiles(models):
+    """Producto cartesiano de modelos x num_hands x confianza x escala.
+
+    El primer perfil (primer modelo, 2 manos, 0.5, escala 1.0) es el de
+    máxima calidad y se usa como referencia.
+    """
+    profiles = []
+    for model, num_hands, confidence, scale in itertools.product(
+            models, DEFAULT_NUM_HANDS, DEFAULT_CONFIDENCES, DEFAULT_SCALES):
+        name = f"{os.path.splitext(os.path.basename(model))[0]}-h{num_hands}-c{confidence}-s{scale}"
+        profiles.append({'name': name, 'model': model, 'num_hands': num_hands,
+                         'min_confidence': confidence, 'scale': scale})
+    return profiles
+
+
+def frame_signature(gesture_info):
+    """Conjunto comparable de (mano, gesto) de un frame"""
+    return tuple(sorted((info['hand'], info['gesture']) for info in gesture_info))
+
+
+def run_profile(profile, frames, fps):
+    """Procesa todos los frames con un perfil y devuelve tiempos y firmas"""
+    recognizer = create_recognizer(profile['model'], profile['num_hands'],
+                                   profile['min_confidence'])
+    frame_ms = 1000.0 / fps
+    scale = profile['scale']
+    latencies = np.zeros(len(frames))
+    signatures = []
+
+    for i, rgb_frame in enumerate(frames):
+        start = time.perf_counter()
+        if scale != 1.0:
+            rgb_frame = cv2.resize(rgb_frame, None, fx=scale, fy=scale,
+                                   interpolation=cv2.INTER_AREA)
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
+        result = recognizer.recognize_for_video(mp_image, int(i * frame_ms))
+        latencies[i] = time.perf_counter() - start
+        signatures.append(frame_signature(build_gesture_info(result)))
+
+    recognizer.close()
+    return latencies, signatures
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de perfiles del reconocedor de gestos")
+    parser.add_argument("clip", help="Clip de video grabado")
+    parser.add_argument("--models", nargs="+", default=None,
+                        help="Archivos .task locales (por defecto el modelo float16 descargado)")
+    parser.add_argument("--profiles", default=None,
+                        help="JSON con una lista de perfiles {name, model, num_hands, "
+                             "min_confidence, scale}; el primero es la referencia")
+    parser.add_argument("--reference", default=None, help="Nombre del perfil de referencia")
+    parser.add_argument("--max-frames", type=int, default=300, help="Frames a usar del clip")
+    parser.add_argument("--accuracy-floor", type=float, default=0.9,
+                        help="Coincidencia mínima para recomendar un perfil")
+    parser.add_argument("-o", "--output", default="benchmark_modelos.json",
+                        help="Archivo JSON de resultados")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    if args.profiles:
+        with open(args.profiles, encoding="utf-8") as f:
+            profiles = json.load(f)
+    else:
+        models = args.models or [download_model()]
+        profiles = default_profiles(models)
+    for profile in profiles:
+        profile['model'] = os.path.abspath(profile['model'])
+
+    reference_name = args.reference or profiles[0]['name']
+    profiles.sort(key=lambda p: p['name'] != reference_name)
+    if profiles[0]['name'] != reference_name:
+        raise SystemExit(f"No existe el perfil de referencia '{reference_name}'")
+
+    frames, fps = load_clip(args.clip, args.max_frames)
+    print("=" * 78)
+    print(f"Clip: {args.clip} ({len(frames)} frames) | Perfiles: {len(profiles)} | "
+          f"Referencia: {reference_name}")
+    print("=" * 78)
+    print(f"{'perfil':40s} {'FPS':>8s} {'p50 ms':>8s} {'p95 ms':>8s} {'coincid.':>9s}")
+
+    results = []
+    reference = None
+    for profile in profiles:
+        latencies, signatures = run_profile(profile, frames, fps)
+        if reference is None:
+            reference = signatures
+        agreement = float(np.mean([a == b for a, b in zip(signatures, reference)]))
+        result = dict(profile,
+                      throughput_fps=len(frames) / latencies.sum(),
+                      p50_ms=float(np.percentile(latencies, 50) * 1000),
+                      p95_ms=float(np.percentile(latencies, 95) * 1000),
+                      agreement=agreement)
+        results.append(result)
+        print(f"{profile['name']:40s} {result['throughput_fps']:8.1f} {result['p50_ms']:8.1f} "
+              f"{result['p95_ms']:8.1f} {agreement:9.1%}")
+
+    benchmark = {
+        'host': platform.node(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'clip': os.path.abspath(args.clip),
+        'frames': len(frames),
+        'reference': reference_name,
+        'results': results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(benchmark, f, indent=2)
+
+    best = select_profile(benchmark, args.accuracy_floor)
+    print("=" * 78)
+    print(f"Perfil recomendado (coincidencia >= {args.accuracy_floor:.0%}): {best['name']} "
+          f"-> {best['throughput_fps']:.1f} FPS, coincidencia {best['agreement']:.1%}")
+    print(f"Resultados: {args.output}  (usar con: gestos.py --profile {args.output})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Clasificador de gestos propio sobre landmarks normalizados (NumPy).
+
+Permite reconocer gestos nuevos sin reentrenar ningún modelo: basta grabar
+muestras con `gestos.py --record gesto.lmlog` mientras se hace el gesto y
+entrenar con ellas. Todas las operaciones trabajan por lotes de (N, 21, 3)
+landmarks, así se clasifican todas las manos de un frame (o de muchos
+frames) con unas pocas operaciones matriciales.
+
+Uso:
+    python3 clasificador.py entrenar --sample ok.lmlog:OK --sample rock.lmlog:Rock -o gestos.npz
+    python3 clasificador.py entrenar --from-log sesion.lmlog -o gestos.npz
+    python3 clasificador.py evaluar gestos.npz sesion.lmlog
+"""
+import argparse
+
+import numpy as np
+
+from eventos import HAND_IDS
+from registro_landmarks import LandmarkLog
+
+REJECT_LABEL = "None"
+
+# Landmarks usados para normalizar: muñeca (origen) y base del dedo medio (escala)
+WRIST = 0
+MIDDLE_MCP = 9
+
+
+def normalize_landmarks(landmarks, mirror=None):
+    """Convierte (N, 21, 3) landmarks en vectores (N, 63) invariantes a posición y tamaño.
+
+    `mirror` es un array booleano por mano: las manos marcadas se reflejan en
+    x para que la izquierda y la derecha compartan las mismas muestras.
+    """
+    points = np.array(landmarks, dtype=np.float32).reshape(-1, 21, 3)
+    points -= points[:, WRIST:WRIST + 1, :]
+    if mirror is not None:
+        points[np.asarray(mirror, dtype=bool), :, 0] *= -1
+    scale = np.linalg.norm(points[:, MIDDLE_MCP, :2], axis=1)
+    points /= np.maximum(scale, 1e-6)[:, None, None]
+    return points.reshape(-1, 21 * 3)
+
+
+def squared_distances(a, b):
+    """Distancias euclídeas al cuadrado entre filas de a (N, D) y b (M, D)"""
+    d2 = (a * a).sum(1)[:, None] + (b * b).sum(1)[None, :] - 2 * a @ b.T
+    return np.maximum(d2, 0.0)
+
+
+class LandmarkClassifier:
+    """Centroide más cercano o kNN sobre landmarks normalizados"""
+    def __init__(self, method="knn", k=5):
+        if method not in ("knn", "centroid"):
+            raise ValueError(f"Método desconocido: {method}")
+        self.method = method
+        self.k = k
+        self.classes = np.array([], dtype=str)
+        self.centroids = None
+        self.samples = None
+        self.sample_labels = None
+        self.max_distance = np.inf
+        self.sigma = 1.0
+
+    def fit(self, landmarks, labels, mirror=None):
+        """Entrena con landmarks (N, 21, 3) y sus etiquetas"""
+        X = normalize_landmarks(landmarks, mirror)
+        if len(X) == 0:
+            raise ValueError("No hay muestras para entrenar (¿todas las etiquetas son 'None'?)")
+        self.classes, y = np.unique(np.asarray(labels, dtype=str), return_inverse=True)
+        self.centroids = np.stack([X[y == i].mean(axis=0) for i in range(len(self.classes))])
+        self.samples = X
+        self.sample_labels = y
+
+        # Umbral de rechazo y escala de score según la dispersión de cada clase
+        own = np.sqrt(((X - self.centroids[y]) ** 2).sum(axis=1))
+        self.sigma = float(np.median(own)) or 1.0
+        self.max_distance = float(np.percentile(own, 95)) * 2.0
+        return self
+
+    def predict(self, landmarks, mirror=None):
+        """Devuelve (etiquetas, scores) para un lote de manos"""
+        X = normalize_landmarks(landmarks, mirror)
+        if len(X) == 0:
+            return np.array([], dtype=self.classes.dtype), np.array([], dtype=np.float32)
+
+        d2_centroids = squared_distances(X, self.centroids)
+        nearest = np.sqrt(d2_centroids.min(axis=1))
+
+        if self.method == "centroid" or self.k <= 1 or len(self.samples) < self.k:
+            # Softmax sobre distancias a los centroides
+            logits = -d2_centroids / (2 * self.sigma ** 2)
+            logits -= logits.max(axis=1, keepdims=True)
+            probs = np.exp(logits)
+            probs /= probs.sum(axis=1, keepdims=True)
+        else:
+            # Votos de los k vecinos más cercanos
+            d2 = squared_distances(X, self.samples)
+            neighbors = np.argpartition(d2, self.k - 1, axis=1)[:, :self.k]
+            votes = np.zeros((len(X), len(self.classes)), dtype=np.float32)
+            rows = np.repeat(np.arange(len(X)), self.k)
+            np.add.at(votes, (rows, self.sample_labels[neighbors].ravel()), 1.0)
+            probs = votes / self.k
+
+        best = probs.argmax(axis=1)
+        labels = self.classes[best].astype(object)
+        scores = probs[np.arange(len(X)), best].astype(np.float32)
+
+        rejected = nearest > self.max_distance
+        labels[rejected] = REJECT_LABEL
+        return labels, scores
+
+    def save(self, path):
+        np.savez(path, method=self.method, k=self.k, classes=self.classes,
+                 centroids=self.centroids, samples=self.samples,
+                 sample_labels=self.sample_labels, max_distance=self.max_distance,
+                 sigma=self.sigma)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path, allow_pickle=False)
+        clf = cls(str(data['method']), int(data['k']))
+        clf.classes = data['classes']
+        clf.centroids = data['centroids']
+        clf.samples = data['samples']
+        clf.sample_labels = data['sample_labels']
+        clf.max_distance = float(data['max_distance'])
+        clf.sigma = float(data['sigma'])
+        return clf
+
+
+def load_samples(path, label=None, skip_none=True):
+    """Lee landmarks, etiquetas y manos a reflejar desde un registro .lmlog"""
+    log = LandmarkLog(path)
+    records = log.records
+    if label is None:
+        labels = np.array([log.gesture_name(g) for g in records['gesture']], dtype=object)
+    else:
+        labels = np.full(len(records), label, dtype=object)
+    keep = labels != REJECT_LABEL if skip_none else np.ones(len(records), dtype=bool)
+    mirror = records['hand'] == HAND_IDS["Izquierda"]
+    return np.asarray(records['landmarks'])[keep], labels[keep], mirror[keep]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Clasificador de gestos sobre landmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    train = sub.add_parser("entrenar", help="Entrenar desde registros .lmlog")
+    train.add_argument("--sample", action="append", default=[], metavar="ARCHIVO:GESTO",
+                       help="Registro grabado haciendo un único gesto")
+    train.add_argument("--from-log", action="append", default=[], metavar="ARCHIVO",
+                       help="Registro cuyas etiquetas de gesto se usan tal cual")
+    train.add_argument("--method", choices=["knn", "centroid"], default="knn")
+    train.add_argument("-k", type=int, default=5)
+    train.add_argument("-o", "--output", required=True, help="Archivo .npz del clasificador")
+
+    evaluate = sub.add_parser("evaluar", help="Clasificar un registro completo y comparar etiquetas")
+    evaluate.add_argument("model", help="Archivo .npz del clasificador")
+    evaluate.add_argument("log", help="Registro .lmlog")
+
+    args = parser.parse_args()
+
+    if args.command == "entrenar":
+        parts = [load_samples(path) for path in args.from_log]
+        for spec in args.sample:
+            path, _, label = spec.rpartition(":")
+            parts.append(load_samples(path, label))
+        if not parts:
+            parser.error("Hace falta al menos un --sample o --from-log")
+
+        landmarks = np.concatenate([p[0] for p in parts])
+        labels = np.concatenate([p[1] for p in parts])
+        mirror = np.concatenate([p[2] for p in parts])
+        try:
+            clf = LandmarkClassifier(args.method, args.k).fit(landmarks, labels, mirror)
+        except ValueError as e:
+            parser.error(str(e))
+        clf.save(args.output)
+
+        print(f"Clasificador guardado en {args.output} ({args.method}, {len(labels)} muestras)")
+        for name in clf.classes:
+            print(f"  {name:12s} {int((labels == name).sum())} muestras")
+        print(f"  Distancia máxima de aceptación: {clf.max_distance:.3f}")
+    else:
+        clf = LandmarkClassifier.load(args.model)
+        landmarks, labels, mirror = load_samples(args.log, skip_none=False)
+        predicted, scores = clf.predict(landmarks, mirror)
+        agree = float((predicted == labels).mean()) if len(labels) else 0.0
+        print(f"Registros: {len(labels)} | coincidencia con las etiquetas: {agree:.1%}")
+        for name in np.unique(predicted):
+            print(f"  {name:12s} {int((predicted == name).sum())}")
+
+
+if __name__ == "__main__":
+    main()
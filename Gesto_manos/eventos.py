@@ -0,0 +1,296 @@
+"""Flujo de eventos de gestos por IPC local (socket Unix de datagramas).
+
+El publicador vive dentro de gestos.py; cualquier otro proceso del mismo host
+(por ejemplo un controlador de juego) puede suscribirse con GestureSubscriber.
+
+Cada evento es un datagrama binario de tamaño fijo (EVENT_SIZE bytes):
+    tipo (B), gesto (B), mano (B), relleno, score (f32),
+    timestamp de captura (f64), timestamp de publicación (f64),
+    nombre del gesto (GESTURE_LABEL_SIZE bytes UTF-8), landmarks 21x3 (f32)
+El id de gesto sólo cubre los gestos de MediaPipe (UNKNOWN_GESTURE para el
+resto); el nombre viaja siempre, así los gestos de un clasificador propio
+("Rock", "OK") llegan con su etiqueta.
+Los timestamps usan time.monotonic(), que en Linux es común a todos los
+procesos, así el consumidor puede medir la latencia captura -> entrega.
+"""
+import os
+import socket
+import struct
+import time
+import argparse
+from collections import deque
+
+import numpy as np
+
+DEFAULT_SOCKET_PATH = "/tmp/gestos.sock"
+
+# Tipos de evento (semántica por flancos)
+EVENT_STARTED = 1
+EVENT_ENDED = 2
+EVENT_NAMES = {EVENT_STARTED: "started", EVENT_ENDED: "ended"}
+
+GESTURE_NAMES = ["None", "Closed_Fist", "Open_Palm", "Pointing_Up",
+                 "Thumb_Down", "Thumb_Up", "Victory", "ILoveYou"]
+GESTURE_IDS = {name: idx for idx, name in enumerate(GESTURE_NAMES)}
+UNKNOWN_GESTURE = 255
+
+HAND_NAMES = ["Izquierda", "Derecha", "Desconocida"]
+HAND_IDS = {name: idx for idx, name in enumerate(HAND_NAMES)}
+
+GESTURE_LABEL_SIZE = 24
+EVENT_STRUCT = struct.Struct(f"<BBBxfdd{GESTURE_LABEL_SIZE}s")
+LANDMARK_COUNT = 21 * 3
+EVENT_SIZE = EVENT_STRUCT.size + LANDMARK_COUNT * 4
+
+SUBSCRIBE = b"SUB"
+UNSUBSCRIBE = b"UNSUB"
+
+
+def encode_event(event_type, gesture, hand, score, capture_ts, landmarks):
+    """Empaqueta un evento en EVENT_SIZE bytes"""
+    label = gesture.encode("utf-8")[:GESTURE_LABEL_SIZE]
+    header = EVENT_STRUCT.pack(event_type, GESTURE_IDS.get(gesture, UNKNOWN_GESTURE),
+                               HAND_IDS.get(hand, HAND_IDS["Desconocida"]),
+                               score, capture_ts, time.monotonic(), label)
+    if landmarks is None:
+        landmarks = np.zeros((21, 3), dtype=np.float32)
+    return header + np.asarray(landmarks, dtype=np.float32).tobytes()
+
+
+def decode_event(data):
+    """Desempaqueta un datagrama en un diccionario"""
+    event_type, gesture_id, hand_id, score, capture_ts, publish_ts, label = \
+        EVENT_STRUCT.unpack_from(data)
+    landmarks = np.frombuffer(data, dtype=np.float32, count=LANDMARK_COUNT,
+                              offset=EVENT_STRUCT.size).reshape(21, 3)
+    gesture = label.rstrip(b"\0").decode("utf-8", errors="ignore") or (
+        GESTURE_NAMES[gesture_id] if gesture_id < len(GESTURE_NAMES) else None)
+    return {
+        'event': EVENT_NAMES.get(event_type, event_type),
+        'gesture': gesture,
+        'hand': HAND_NAMES[hand_id] if hand_id < len(HAND_NAMES) else None,
+        'score': score,
+        'capture_ts': capture_ts,
+        'publish_ts': publish_ts,
+        'landmarks': landmarks
+    }
+
+
+class GestureDebouncer:
+    """Convierte gestos por frame en eventos 'started'/'ended' por mano.
+
+    Un gesto empieza cuando se observa en min_frames frames consecutivos y
+    termina cuando otro gesto (o ninguno) se mantiene min_frames frames, o
+    cuando la mano desaparece durante más de release_s segundos.
+    """
+    def __init__(self, min_frames=3, release_s=0.3):
+        self.min_frames = min_frames
+        self.release_s = release_s
+        # mano -> {'active', 'candidate', 'count', 'last_seen', 'info'}
+        self.hands = {}
+
+    def update(self, gesture_info, capture_ts):
+        """Devuelve la lista de eventos (tipo, info) generados por este frame"""
+        events = []
+        seen = set()
+
+        for info in gesture_info:
+            hand = info['hand']
+            gesture = info.get('gesture', info['text'])
+            if gesture == "None":
+                gesture = None
+            seen.add(hand)
+
+            state = self.hands.setdefault(hand, {'active': None, 'candidate': None,
+                                                 'count': 0, 'last_seen': capture_ts,
+                                                 'info': info})
+            state['last_seen'] = capture_ts
+            state['info'] = info
+
+            if gesture == state['active']:
+                state['candidate'] = None
+                state['count'] = 0
+                continue
+
+            if gesture == state['candidate']:
+                state['count'] += 1
+            else:
+                state['candidate'] = gesture
+                state['count'] = 1
+
+            if state['count'] >= self.min_frames:
+                if state['active'] is not None:
+                    events.append((EVENT_ENDED, state['active'], info))
+                if gesture is not None:
+                    events.append((EVENT_STARTED, gesture, info))
+                state['active'] = gesture
+                state['candidate'] = None
+                state['count'] = 0
+
+        # Manos que dejaron de verse
+        for hand, state in list(self.hands.items()):
+            if hand in seen:
+                continue
+            if capture_ts - state['last_seen'] >= self.release_s:
+                if state['active'] is not None:
+                    events.append((EVENT_ENDED, state['active'], state['info']))
+                del self.hands[hand]
+
+        return events
+
+
+class GesturePublisher:
+    """Publica eventos de gestos a los suscriptores registrados en un socket Unix.
+
+    El envío es no bloqueante: si el buffer de un suscriptor está lleno el
+    evento se descarta para ese suscriptor y se cuenta como pérdida.
+    """
+    def __init__(self, path=DEFAULT_SOCKET_PATH, min_frames=3, release_s=0.3):
+        self.path = path
+        self.debouncer = GestureDebouncer(min_frames, release_s)
+        self.subscribers = set()
+
+        if os.path.exists(path):
+            os.unlink(path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(path)
+        self.sock.setblocking(False)
+
+        # Estadísticas
+        self.events_sent = 0
+        self.events_dropped = 0
+        self.publish_count = 0
+        self.publish_time_total = 0.0
+        self.publish_time_max = 0.0
+
+    def _poll_subscriptions(self):
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(64)
+            except (BlockingIOError, InterruptedError):
+                return
+            if not addr:
+                continue
+            if data == SUBSCRIBE:
+                self.subscribers.add(addr)
+            elif data == UNSUBSCRIBE:
+                self.subscribers.discard(addr)
+
+    def publish(self, gesture_info, capture_ts):
+        """Procesa los gestos de un frame y envía los eventos de flanco"""
+        start = time.perf_counter()
+        self._poll_subscriptions()
+
+        events = self.debouncer.update(gesture_info, capture_ts)
+        for event_type, gesture, info in events:
+            if not self.subscribers:
+                break
+            payload = encode_event(event_type, gesture, info['hand'], info['score'],
+                                   capture_ts, info.get('landmarks'))
+            for addr in list(self.subscribers):
+                try:
+                    self.sock.sendto(payload, addr)
+                    self.events_sent += 1
+                except BlockingIOError:
+                    self.events_dropped += 1
+                except (ConnectionRefusedError, FileNotFoundError):
+                    self.subscribers.discard(addr)
+
+        elapsed = time.perf_counter() - start
+        self.publish_count += 1
+        self.publish_time_total += elapsed
+        self.publish_time_max = max(self.publish_time_max, elapsed)
+        return events
+
+    def get_stats(self):
+        avg = self.publish_time_total / self.publish_count if self.publish_count else 0.0
+        return {
+            'subscribers': len(self.subscribers),
+            'events_sent': self.events_sent,
+            'events_dropped': self.events_dropped,
+            'publish_avg_us': avg * 1e6,
+            'publish_max_us': self.publish_time_max * 1e6
+        }
+
+    def close(self):
+        self.sock.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+class GestureSubscriber:
+    """Cliente que recibe los eventos publicados y mide su latencia"""
+    def __init__(self, path=DEFAULT_SOCKET_PATH, window=1000):
+        self.publisher_path = path
+        self.path = f"/tmp/gestos-sub-{os.getpid()}.sock"
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self.sock.bind(self.path)
+        self.sock.sendto(SUBSCRIBE, self.publisher_path)
+
+        # Latencias recientes en segundos
+        self.capture_latency = deque(maxlen=window)
+        self.delivery_latency = deque(maxlen=window)
+
+    def recv(self, timeout=None):
+        """Espera un evento; devuelve None si se agota el timeout"""
+        self.sock.settimeout(timeout)
+        try:
+            data = self.sock.recv(EVENT_SIZE)
+        except socket.timeout:
+            return None
+        now = time.monotonic()
+        event = decode_event(data)
+        event['capture_latency'] = now - event['capture_ts']
+        event['delivery_latency'] = now - event['publish_ts']
+        self.capture_latency.append(event['capture_latency'])
+        self.delivery_latency.append(event['delivery_latency'])
+        return event
+
+    def latency_stats(self):
+        """Percentiles (ms) de latencia captura->entrega y publicación->entrega"""
+        stats = {}
+        for name, values in (('capture', self.capture_latency),
+                             ('delivery', self.delivery_latency)):
+            if values:
+                p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+                stats[name] = {'p50_ms': p50, 'p95_ms': p95, 'p99_ms': p99}
+        return stats
+
+    def close(self):
+        try:
+            self.sock.sendto(UNSUBSCRIBE, self.publisher_path)
+        except OSError:
+            pass
+        self.sock.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escucha eventos de gestos de gestos.py")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET_PATH, help="Socket del publicador")
+    args = parser.parse_args()
+
+    subscriber = GestureSubscriber(args.socket)
+    print(f"[EVENTOS] Suscrito a {args.socket} (Ctrl+C para salir)")
+    try:
+        while True:
+            event = subscriber.recv(timeout=1.0)
+            if event is None:
+                continue
+            print(f"[EVENTOS] {event['event']:7s} {event['gesture'] or '?':12s} "
+                  f"{event['hand'] or '?':11s} score={event['score']:.2f} "
+                  f"latencia={event['capture_latency'] * 1000:.1f} ms")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for name, values in subscriber.latency_stats().items():
+            print(f"[EVENTOS] Latencia {name}: p50={values['p50_ms']:.2f} ms "
+                  f"p95={values['p95_ms']:.2f} ms p99={values['p99_ms']:.2f} ms")
+        subscriber.close()
+
+
+if __name__ == "__main__":
+    main()
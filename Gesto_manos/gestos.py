@@ -1,13 +1,26 @@
 import cv2
+import numpy as np
 import mediapipe as mp
 from mediapipe.tasks import python
 from mediapipe.tasks.python import vision
 import time
 import urllib.request
 import os
+import hashlib
+import tempfile
+import zipfile
+import json
+import platform
 import threading
+import argparse
+from eventos import GesturePublisher, DEFAULT_SOCKET_PATH
+from metricas import PipelineMetrics, MetricsServer, StartupTimeline
+from registro_landmarks import LandmarkLogWriter
+from clasificador import LandmarkClassifier
+from preview_mjpeg import MJPEGStreamer
 from queue import Queue
-from collections import deque
+from collections import deque, namedtuple
+from types import SimpleNamespace
 
 # ==================== CONFIGURACIÓN GLOBAL ====================
 class SharedResources:
@@ -22,12 +35,21 @@ class SharedResources:
         
         # Datos compartidos (sección crítica)
         self.current_frame = None
+        self.current_trace = None
         self.processed_frame = None
+        self.processed_trace = None
+        self.processed_displayed = True
         self.gesture_results = None
         
         # Flags de control
         self.running = True
         self.new_frame_available = False
+        # Se activa cuando el reconocedor está listo; antes la cámara sólo se calienta
+        self.processing_ready = threading.Event()
+        # Resolución de captura pedida por el controlador adaptativo
+        self.capture_resolution = None
+        self.resolution_changed = threading.Event()
+        self.timeline = StartupTimeline()
         
         # Estadísticas
         self.stats_lock = threading.Lock()
@@ -35,42 +57,76 @@ class SharedResources:
         self.frames_processed = 0
         self.capture_fps = 0.0
         self.processing_fps = 0.0
+        self.skip_ratio = 0.0
+        self.overlay_ms = 0.0
         
-    def set_frame(self, frame):
+        # Trazas de latencia por frame y descartes por motivo
+        self.metrics = PipelineMetrics()
+        
+    def set_frame(self, frame, trace=None):
         """Guarda un nuevo frame capturado (sección crítica)"""
         with self.frame_lock:  # MUTEX: Entrada a sección crítica
             self.current_frame = frame.copy()
+            self.current_trace = trace if trace is not None else self.metrics.new_trace()
             self.new_frame_available = True
             self.frames_captured += 1
             
     def get_frame(self):
-        """Obtiene el frame actual para procesamiento (sección crítica)"""
+        """Obtiene el frame actual y su traza de latencia (sección crítica)"""
         with self.frame_lock:  # MUTEX: Entrada a sección crítica
             if self.current_frame is not None:
                 frame = self.current_frame.copy()
                 self.new_frame_available = False
-                return frame
-        return None
+                self.current_trace.mark('dequeue')
+                return frame, self.current_trace
+        return None, None
     
-    def set_results(self, frame, results):
+    def set_results(self, frame, results, trace=None):
         """Guarda los resultados del procesamiento (sección crítica)"""
         with self.frame_lock:  # MUTEX: Entrada a sección crítica
+            if not self.processed_displayed:
+                # El frame anterior se reemplaza sin haberse mostrado
+                self.metrics.count_drop('not_displayed')
             self.processed_frame = frame
+            self.processed_trace = trace
+            self.processed_displayed = False
             self.gesture_results = results
             self.frames_processed += 1
     
+    def request_capture_resolution(self, resolution):
+        """Pide al hilo de captura un cambio de resolución"""
+        if resolution != self.capture_resolution:
+            self.capture_resolution = resolution
+            self.resolution_changed.set()
+    
     def get_results(self):
         """Obtiene los resultados para visualización (sección crítica)"""
         with self.frame_lock:  # MUTEX: Entrada a sección crítica
             return self.processed_frame, self.gesture_results
     
-    def update_stats(self, capture_fps=None, processing_fps=None):
+    def mark_displayed(self):
+        """Registra la visualización del último frame procesado (sección crítica)"""
+        with self.frame_lock:  # MUTEX: Entrada a sección crítica
+            if self.processed_displayed:
+                return
+            self.processed_displayed = True
+            trace = self.processed_trace
+        if trace is not None:
+            trace.mark('display')
+            self.metrics.observe_trace(trace)
+    
+    def update_stats(self, capture_fps=None, processing_fps=None, skip_ratio=None,
+                     overlay_ms=None):
         """Actualiza estadísticas (sección crítica)"""
         with self.stats_lock:  
             if capture_fps is not None:
                 self.capture_fps = capture_fps
             if processing_fps is not None:
                 self.processing_fps = processing_fps
+            if skip_ratio is not None:
+                self.skip_ratio = skip_ratio
+            if overlay_ms is not None:
+                self.overlay_ms = overlay_ms
     
     def get_stats(self):
         """Obtiene estadísticas (sección crítica)"""
@@ -79,97 +135,649 @@ class SharedResources:
                 'frames_captured': self.frames_captured,
                 'frames_processed': self.frames_processed,
                 'capture_fps': self.capture_fps,
-                'processing_fps': self.processing_fps
+                'processing_fps': self.processing_fps,
+                'skip_ratio': self.skip_ratio,
+                'overlay_ms': self.overlay_ms
             }
 
-def download_model():
-    """Descarga el modelo de reconocimiento de gestos si no existe"""
-    model_path = "gesture_recognizer.task"
+MODEL_URL = "https://storage.googleapis.com/mediapipe-models/gesture_recognizer/gesture_recognizer/float16/latest/gesture_recognizer.task"
+MODEL_NAME = "gesture_recognizer.task"
+HAND_LANDMARKER_URL = "https://storage.googleapis.com/mediapipe-models/hand_landmarker/hand_landmarker/float16/latest/hand_landmarker.task"
+HAND_LANDMARKER_NAME = "hand_landmarker.task"
+
+def file_sha256(path):
+    """Calcula el SHA-256 de un archivo por bloques"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def verify_model(model_path, expected_sha256=None):
+    """Comprueba que el modelo esté completo.
+
+    El .task es un archivo zip, así que una descarga parcial no pasa
+    zipfile.is_zipfile. El hash se compara con `expected_sha256` si se da, o
+    con el guardado en <modelo>.sha256 al descargarlo.
+    """
+    if not os.path.isfile(model_path) or not zipfile.is_zipfile(model_path):
+        return False
+    
+    if expected_sha256 is None:
+        sidecar = model_path + ".sha256"
+        if os.path.exists(sidecar):
+            with open(sidecar) as f:
+                expected_sha256 = f.read().strip()
     
-    if not os.path.exists(model_path):
-        print("Descargando modelo de reconocimiento de gestos...")
-        model_url = "https://storage.googleapis.com/mediapipe-models/gesture_recognizer/gesture_recognizer/float16/latest/gesture_recognizer.task"
-        urllib.request.urlretrieve(model_url, model_path)
-        print("Modelo descargado exitosamente!")
+    if expected_sha256 is not None:
+        return file_sha256(model_path) == expected_sha256.lower()
+    return True
+
+def download_model(model_dir=None, offline=False, expected_sha256=None,
+                   model_url=MODEL_URL, model_name=MODEL_NAME):
+    """Descarga el modelo de reconocimiento de gestos si no existe o está dañado.
+
+    El directorio de caché se toma de `model_dir`, de la variable de entorno
+    GESTOS_MODEL_DIR o del directorio actual. La descarga se escribe en un
+    archivo temporal y se mueve con os.replace, así nunca queda un modelo a
+    medias con el nombre definitivo. Con `offline=True` no se usa la red y se
+    falla de inmediato si el modelo en caché no es válido.
+    """
+    model_dir = model_dir or os.environ.get("GESTOS_MODEL_DIR", ".")
+    model_path = os.path.join(model_dir, model_name)
+    
+    if verify_model(model_path, expected_sha256):
+        return model_path
+    
+    if offline:
+        raise RuntimeError(f"Modo offline: no hay un modelo válido en {model_path}")
+    
+    if os.path.exists(model_path):
+        print("El modelo en caché está incompleto o dañado, se descargará de nuevo")
+    
+    os.makedirs(model_dir, exist_ok=True)
+    print("Descargando modelo de reconocimiento de gestos...")
+    fd, tmp_path = tempfile.mkstemp(dir=model_dir, prefix=model_name, suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as f, urllib.request.urlopen(model_url, timeout=30) as response:
+            digest = hashlib.sha256()
+            for block in iter(lambda: response.read(1 << 20), b""):
+                f.write(block)
+                digest.update(block)
+        sha256 = digest.hexdigest()
+        
+        if not zipfile.is_zipfile(tmp_path):
+            raise RuntimeError("El modelo descargado no es un archivo .task válido")
+        if expected_sha256 is not None and sha256 != expected_sha256.lower():
+            raise RuntimeError(f"SHA-256 no coincide: {sha256} != {expected_sha256}")
+        
+        os.replace(tmp_path, model_path)
+        with open(model_path + ".sha256", "w") as f:
+            f.write(sha256 + "\n")
+    finally:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    print("Modelo descargado exitosamente!")
     
     return model_path
 
-def draw_landmarks_on_image(rgb_image, detection_result):
-    """Dibuja los landmarks de las manos en la imagen"""
-    hand_landmarks_list = detection_result.hand_landmarks
-    annotated_image = rgb_image.copy()
-    h, w, _ = annotated_image.shape
-    
-    FINGER_COLORS = [
-        (255, 0, 0),    # Pulgar - Rojo
-        (0, 255, 0),    # Índice - Verde
-        (0, 0, 255),    # Medio - Azul
-        (255, 255, 0),  # Anular - Amarillo
-        (255, 0, 255)   # Meñique - Magenta
-    ]
-    
-    # Conexiones de la mano
-    HAND_CONNECTIONS = [
-        (0, 1), (1, 2), (2, 3), (3, 4),  # Pulgar
-        (0, 5), (5, 6), (6, 7), (7, 8),  # Índice
-        (0, 9), (9, 10), (10, 11), (11, 12),  # Medio
-        (0, 13), (13, 14), (14, 15), (15, 16),  # Anular
-        (0, 17), (17, 18), (18, 19), (19, 20),  # Meñique
-        (5, 9), (9, 13), (13, 17)  # Palma
-    ]
-    
-    for hand_landmarks in hand_landmarks_list:
-        # Dibujar las conexiones
-        for connection in HAND_CONNECTIONS:
-            start_idx = connection[0]
-            end_idx = connection[1]
-            
-            start_point = hand_landmarks[start_idx]
-            end_point = hand_landmarks[end_idx]
-            
-            start_x = int(start_point.x * w)
-            start_y = int(start_point.y * h)
-            end_x = int(end_point.x * w)
-            end_y = int(end_point.y * h)
-            
-            # Color basado en el dedo
-            if end_idx <= 4:
-                color = FINGER_COLORS[0]
-            elif end_idx <= 8:
-                color = FINGER_COLORS[1]
-            elif end_idx <= 12:
-                color = FINGER_COLORS[2]
-            elif end_idx <= 16:
-                color = FINGER_COLORS[3]
-            else:
-                color = FINGER_COLORS[4]
-            
-            cv2.line(annotated_image, (start_x, start_y), (end_x, end_y), color, 2)
+# ==================== GATING DE INFERENCIA ====================
+Landmark = namedtuple('Landmark', ['x', 'y', 'z'])
+
+class InferenceGate:
+    """Decide en cada frame si hace falta ejecutar el reconocedor completo.
+
+    1. Diferencia de frames reducidos: si la escena casi no cambió se reutilizan
+       (o extrapolan) los últimos landmarks sin llamar al modelo.
+    2. Seguimiento por ROI: con una mano confirmada, el modelo corre sólo sobre
+       un recorte alrededor de los últimos landmarks. El seguimiento se da por
+       perdido si desaparece una mano, si una mano toca el borde del recorte
+       (está saliendo de él) o si los landmarks saltan más de `max_track_jump`
+       tamaños de mano respecto de la posición prevista; entonces se vuelve a
+       detectar sobre el frame completo en el frame siguiente.
+
+    Los recortes van a `roi_recognizer`, una segunda instancia del modelo,
+    para que el grafo en modo VIDEO de cada reconocedor vea siempre la misma
+    geometría de imagen. Sin `roi_recognizer` no se hace seguimiento por ROI;
+    load_roi_recognizer() lo crea en segundo plano, fuera del arranque.
+    """
+    def __init__(self, motion_threshold=3.0, max_reuse=4, diff_size=(64, 48),
+                 roi_margin=0.35, min_roi_size=128, max_track_jump=0.5, roi_border=0.02,
+                 roi_recognizer=None):
+        self.motion_threshold = motion_threshold
+        self.max_reuse = max_reuse
+        self.diff_size = diff_size
+        self.roi_margin = roi_margin
+        self.min_roi_size = min_roi_size
+        self.max_track_jump = max_track_jump
+        self.roi_border = roi_border
+        self.roi_recognizer = roi_recognizer
+        self.roi_loader = None
+        
+        # Estado del seguimiento
+        self.prev_small = None
+        self.last_result = SimpleNamespace(hand_landmarks=[], gestures=[], handedness=[])
+        self.last_points = None
+        self.velocity = None
+        self.roi = None
+        self.reused = 0
+        self.last_timestamp = -1
+        self.last_ran = False  # si el último recognize() ejecutó el modelo
+        
+        # Estadísticas
+        self.frames_total = 0
+        self.frames_skipped = 0
+        self.frames_roi = 0
+        self.frames_full = 0
+    
+    def motion_score(self, rgb_frame):
+        """Diferencia absoluta media entre el frame reducido actual y el anterior"""
+        small = cv2.resize(rgb_frame, self.diff_size, interpolation=cv2.INTER_AREA)
+        small = cv2.cvtColor(small, cv2.COLOR_RGB2GRAY)
+        prev, self.prev_small = self.prev_small, small
+        if prev is None:
+            return float('inf')
+        return float(cv2.absdiff(small, prev).mean())
+    
+    def recognize(self, recognizer, rgb_frame, timestamp_ms):
+        """Devuelve un resultado compatible con GestureRecognizerResult"""
+        self.frames_total += 1
+        motion = self.motion_score(rgb_frame)
+        
+        if motion < self.motion_threshold and self.reused < self.max_reuse:
+            self.reused += 1
+            self.frames_skipped += 1
+            self.last_ran = False
+            return self._extrapolate()
+        
+        self.last_ran = True
+        tracked = True
+        if self.roi is not None and self.roi_recognizer is not None:
+            result = self._run(self.roi_recognizer, rgb_frame, timestamp_ms, self.roi)
+            tracked = self._tracking_ok(result, rgb_frame.shape)
+            self.frames_roi += 1
+        else:
+            result = self._run(recognizer, rgb_frame, timestamp_ms, None)
+            self.frames_full += 1
+        
+        self._update_tracking(result, rgb_frame.shape)
+        if not tracked:
+            # Seguimiento perdido: se usa el resultado del recorte y la detección
+            # completa queda para el próximo frame (nunca dos inferencias por frame)
+            self.roi = None
+        self.last_result = result
+        self.reused = 0
+        return result
+    
+    def skip_ratio(self):
+        if self.frames_total == 0:
+            return 0.0
+        return self.frames_skipped / self.frames_total
+    
+    def load_roi_recognizer(self, factory):
+        """Crea el reconocedor de recortes en un hilo aparte (hasta entonces, sin ROI)"""
+        def load():
+            try:
+                self.roi_recognizer = factory()
+            except Exception as e:
+                print(f"[GATE] No se pudo crear el reconocedor de ROI: {e}")
+        self.roi_loader = threading.Thread(target=load, name="RoiRecognizerLoader", daemon=True)
+        self.roi_loader.start()
+    
+    def close(self):
+        if self.roi_loader is not None:
+            self.roi_loader.join()
+        if self.roi_recognizer is not None:
+            self.roi_recognizer.close()
+    
+    def _run(self, recognizer, rgb_frame, timestamp_ms, roi):
+        # VIDEO mode exige timestamps estrictamente crecientes (se comparten
+        # entre ambos reconocedores, así cada uno también los ve crecientes)
+        timestamp_ms = max(timestamp_ms, self.last_timestamp + 1)
+        self.last_timestamp = timestamp_ms
+        
+        if roi is None:
+            mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
+            return recognizer.recognize_for_video(mp_image, timestamp_ms)
+        
+        # La ROI se guarda normalizada para tolerar cambios de resolución
+        h, w = rgb_frame.shape[:2]
+        x0, y0 = int(roi[0] * w), int(roi[1] * h)
+        x1, y1 = int(roi[2] * w), int(roi[3] * h)
+        crop = np.ascontiguousarray(rgb_frame[y0:y1, x0:x1])
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=crop)
+        # El clasificador propio se entrenó con coordenadas del frame completo:
+        # se clasifica después de mapear los landmarks, no sobre el recorte
+        own_classifier = isinstance(recognizer, LandmarkGestureRecognizer)
+        if own_classifier:
+            result = recognizer.recognize_for_video(mp_image, timestamp_ms, classify=False)
+        else:
+            result = recognizer.recognize_for_video(mp_image, timestamp_ms)
+        
+        # Llevar los landmarks del recorte a coordenadas del frame completo
+        sx, sy = (x1 - x0) / w, (y1 - y0) / h
+        ox, oy = x0 / w, y0 / h
+        for hand_landmarks in result.hand_landmarks:
+            for landmark in hand_landmarks:
+                landmark.x = ox + landmark.x * sx
+                landmark.y = oy + landmark.y * sy
+        if own_classifier:
+            result.gestures = recognizer.classify(result.hand_landmarks, result.handedness)
+        return result
+    
+    def _tracking_ok(self, result, shape):
+        """Señales de seguimiento sobre landmarks ya en coordenadas del frame completo"""
+        tracked = 0 if self.last_points is None else len(self.last_points)
+        if not result.hand_landmarks or len(result.hand_landmarks) < tracked:
+            return False
+        
+        h, w = shape[:2]
+        scale = np.array([w, h], dtype=np.float32)
+        points = np.array([[(lm.x, lm.y) for lm in hand] for hand in result.hand_landmarks],
+                          dtype=np.float32) * scale
+        
+        # Una mano pegada al borde del recorte (que no sea el del frame) se está saliendo
+        x0, y0, x1, y1 = self.roi[0] * w, self.roi[1] * h, self.roi[2] * w, self.roi[3] * h
+        border = self.roi_border * max(x1 - x0, y1 - y0)
+        xs, ys = points[..., 0], points[..., 1]
+        if ((x0 > 0.5 and xs.min() < x0 + border) or (x1 < w - 0.5 and xs.max() > x1 - border) or
+                (y0 > 0.5 and ys.min() < y0 + border) or (y1 < h - 0.5 and ys.max() > y1 - border)):
+            return False
+        
+        # Salto respecto a la posición prevista, en tamaños de mano
+        if self.last_points is not None:
+            predicted = self.last_points[..., :2]
+            if self.velocity is not None:
+                predicted = predicted + self.velocity[..., :2] * (self.reused + 1)
+            predicted = predicted * scale
+            sizes = np.maximum(np.ptp(predicted, axis=1).max(axis=1), 1.0)
+            for hand in points:
+                jumps = np.linalg.norm(predicted - hand, axis=2).mean(axis=1) / sizes
+                if jumps.min() > self.max_track_jump:
+                    return False
+        return True
+    
+    def _update_tracking(self, result, shape):
+        if not result.hand_landmarks:
+            self.last_points = None
+            self.velocity = None
+            self.roi = None
+            return
+        
+        points = np.array([[(lm.x, lm.y, lm.z) for lm in hand]
+                           for hand in result.hand_landmarks], dtype=np.float32)
+        if self.last_points is not None and self.last_points.shape == points.shape:
+            self.velocity = (points - self.last_points) / (self.reused + 1)
+        else:
+            self.velocity = None
+        self.last_points = points
+        
+        # ROI = caja envolvente de todas las manos + margen
+        h, w = shape[:2]
+        xs = points[:, :, 0] * w
+        ys = points[:, :, 1] * h
+        bx0, bx1 = float(xs.min()), float(xs.max())
+        by0, by1 = float(ys.min()), float(ys.max())
+        side = max(bx1 - bx0, by1 - by0, self.min_roi_size) * (1 + 2 * self.roi_margin)
+        cx, cy = (bx0 + bx1) / 2, (by0 + by1) / 2
+        x0 = int(max(0, cx - side / 2))
+        y0 = int(max(0, cy - side / 2))
+        x1 = int(min(w, cx + side / 2))
+        y1 = int(min(h, cy + side / 2))
+        if (x1 - x0) < w or (y1 - y0) < h:
+            self.roi = (x0 / w, y0 / h, x1 / w, y1 / h)
+        else:
+            self.roi = None
+    
+    def _extrapolate(self):
+        if self.last_points is None or self.velocity is None:
+            return self.last_result
+        
+        points = np.clip(self.last_points + self.velocity * self.reused, 0.0, 1.0)
+        hand_landmarks = [[Landmark(float(x), float(y), float(z)) for x, y, z in hand]
+                          for hand in points]
+        return SimpleNamespace(hand_landmarks=hand_landmarks,
+                               gestures=self.last_result.gestures,
+                               handedness=self.last_result.handedness)
+
+# ==================== CONTROL ADAPTATIVO ====================
+# Niveles de calidad, de mayor a menor costo:
+# (resolución de captura, escala antes de la inferencia, stride de inferencia)
+QUALITY_LEVELS = [
+    ((640, 480), 1.0, 1),
+    ((640, 480), 0.75, 1),
+    ((640, 480), 0.5, 1),
+    ((640, 480), 0.5, 2),
+    ((320, 240), 1.0, 2),
+    ((320, 240), 0.75, 3),
+]
+
+class AdaptiveController:
+    """Controlador en lazo cerrado de resolución, escala y stride de inferencia.
+
+    Cada `interval` segundos compara los FPS de procesamiento y el p95 de la
+    latencia cola + inferencia con los objetivos. Baja un nivel de calidad
+    tras `down_checks` chequeos malos seguidos y sube uno tras `up_checks`
+    chequeos con margen (latencia y ocupación por debajo de `headroom`).
+    """
+    def __init__(self, shared_resources, target_fps=15.0, target_latency_ms=150.0,
+                 interval=1.0, headroom=0.6, down_checks=2, up_checks=5, log_path=None):
+        self.shared_resources = shared_resources
+        self.target_fps = target_fps
+        self.target_latency_ms = target_latency_ms
+        self.interval = interval
+        self.headroom = headroom
+        self.down_checks = down_checks
+        self.up_checks = up_checks
+        self.log_file = open(log_path, "a", encoding="utf-8") if log_path else None
+        
+        self.level = 0
+        self.latency_ms = deque(maxlen=90)
+        self.inference_ms = deque(maxlen=90)
+        self.inferred = deque(maxlen=90)  # si cada frame observado ejecutó el modelo
+        self.last_check = time.monotonic()
+        self.down_votes = 0
+        self.up_votes = 0
+        self.decisions = []
+        self._apply()
+    
+    @property
+    def scale(self):
+        return QUALITY_LEVELS[self.level][1]
+    
+    @property
+    def stride(self):
+        return QUALITY_LEVELS[self.level][2]
+    
+    def observe(self, trace, inferred):
+        """Registra las latencias de un frame procesado"""
+        self.latency_ms.append((trace.inference_end - trace.capture) * 1000)
+        self.inferred.append(inferred)
+        if inferred:
+            self.inference_ms.append((trace.inference_end - trace.inference_start) * 1000)
+    
+    def update(self, processing_fps, capture_fps):
+        """Evalúa el lazo de control; devuelve True si cambió el nivel"""
+        now = time.monotonic()
+        if now - self.last_check < self.interval or not self.latency_ms:
+            return False
+        self.last_check = now
+        
+        # No se puede procesar más rápido de lo que captura la cámara
+        target_fps = min(self.target_fps, capture_fps * 0.95) if capture_fps else self.target_fps
+        p95_ms = float(np.percentile(self.latency_ms, 95))
+        inference_ms = float(np.mean(self.inference_ms)) if self.inference_ms else 0.0
+        # Fracción de frames que ejecutaron el modelo (stride y gating incluidos)
+        inferred_ratio = sum(self.inferred) / len(self.inferred) if self.inferred else 1.0
+        busy = inference_ms * processing_fps * inferred_ratio / 1000
+        
+        if processing_fps < target_fps * 0.9 or p95_ms > self.target_latency_ms:
+            self.down_votes += 1
+            self.up_votes = 0
+        elif (processing_fps >= target_fps and busy < self.headroom and
+              p95_ms < self.target_latency_ms * self.headroom):
+            self.up_votes += 1
+            self.down_votes = 0
+        else:
+            self.down_votes = 0
+            self.up_votes = 0
+        
+        measures = {'processing_fps': round(processing_fps, 2), 'target_fps': round(target_fps, 2),
+                    'p95_latency_ms': round(p95_ms, 1), 'inference_ms': round(inference_ms, 1),
+                    'busy': round(busy, 3)}
+        if self.down_votes >= self.down_checks and self.level < len(QUALITY_LEVELS) - 1:
+            self._change(self.level + 1, "bajar", measures)
+            return True
+        if self.up_votes >= self.up_checks and self.level > 0:
+            self._change(self.level - 1, "subir", measures)
+            return True
+        return False
+    
+    def close(self):
+        if self.log_file is not None:
+            self.log_file.close()
+    
+    def _change(self, level, action, measures):
+        previous = self.level
+        self.level = level
+        self.down_votes = 0
+        self.up_votes = 0
+        self.latency_ms.clear()
+        self.inference_ms.clear()
+        self._apply()
         
-        # Dibujar los puntos
-        for idx, landmark in enumerate(hand_landmarks):
-            x = int(landmark.x * w)
-            y = int(landmark.y * h)
+        (w, h), scale, stride = QUALITY_LEVELS[level]
+        decision = {'t': round(self.shared_resources.timeline.elapsed_now(), 3),
+                    'action': action, 'from': previous, 'to': level,
+                    'resolution': f"{w}x{h}", 'scale': scale, 'stride': stride, **measures}
+        self.decisions.append(decision)
+        print(f"[CONTROL] {action} calidad {previous} -> {level} ({w}x{h}, escala {scale}, "
+              f"stride {stride}) | fps={measures['processing_fps']} "
+              f"p95={measures['p95_latency_ms']} ms ocupación={measures['busy']:.0%}")
+        if self.log_file is not None:
+            self.log_file.write(json.dumps(decision) + "\n")
+            self.log_file.flush()
+    
+    def _apply(self):
+        self.shared_resources.request_capture_resolution(QUALITY_LEVELS[self.level][0])
+
+# ==================== OVERLAY DE LANDMARKS ====================
+# Colores por dedo en BGR (se dibuja directamente sobre el frame de OpenCV)
+FINGER_COLORS = [
+    (0, 0, 255),    # Pulgar - Rojo
+    (0, 255, 0),    # Índice - Verde
+    (255, 0, 0),    # Medio - Azul
+    (0, 255, 255),  # Anular - Amarillo
+    (255, 0, 255)   # Meñique - Magenta
+]
+
+# Conexiones de la mano agrupadas por color como cadenas de puntos.
+# Cada segmento toma el color del dedo de su punto final, igual que antes.
+FINGER_CHAINS = [
+    [[0, 1, 2, 3, 4]],                   # Pulgar
+    [[0, 5, 6, 7, 8]],                   # Índice
+    [[0, 9, 10, 11, 12], [5, 9]],        # Medio + palma
+    [[0, 13, 14, 15, 16], [9, 13]],      # Anular + palma
+    [[0, 17, 18, 19, 20], [13, 17]]      # Meñique + palma
+]
+FINGER_CHAINS = [[np.array(chain, dtype=np.intp) for chain in chains]
+                 for chains in FINGER_CHAINS]
+
+# Índices de landmarks por dedo (0 = muñeca, se dibuja con el pulgar)
+FINGER_POINTS = [np.arange(0, 5), np.arange(5, 9), np.arange(9, 13),
+                 np.arange(13, 17), np.arange(17, 21)]
+
+POINT_RADIUS = 5
+
+def landmarks_to_pixels(hand_landmarks, w, h):
+    """Convierte los 21 landmarks normalizados de una mano en un array (21, 2) int32"""
+    points = np.array([(lm.x, lm.y) for lm in hand_landmarks], dtype=np.float32)
+    points *= (w, h)
+    return points.astype(np.int32)
+
+def draw_landmarks_on_frame(frame, hand_landmarks_list):
+    """Dibuja los landmarks de todas las manos directamente sobre el frame BGR.
+
+    Las conexiones y los puntos se agrupan por color y se dibujan con una
+    llamada a cv2.polylines por color, así el número de llamadas a OpenCV
+    no depende del número de manos.
+    """
+    if not hand_landmarks_list:
+        return frame
+    
+    h, w = frame.shape[:2]
+    hands = [landmarks_to_pixels(hand, w, h) for hand in hand_landmarks_list]
+    
+    # Conexiones: una llamada por color con las cadenas de todas las manos
+    for color, chains in zip(FINGER_COLORS, FINGER_CHAINS):
+        polylines = [points[chain] for points in hands for chain in chains]
+        cv2.polylines(frame, polylines, False, color, 2)
+    
+    # Puntos: un polyline degenerado (p, p) con grosor = diámetro dibuja un
+    # círculo relleno; primero el borde blanco y luego el color del dedo
+    all_points = np.concatenate(hands).reshape(-1, 1, 2)
+    dots = np.repeat(all_points, 2, axis=1)
+    cv2.polylines(frame, list(dots), False, (255, 255, 255), 2 * POINT_RADIUS + 2)
+    for color, idx in zip(FINGER_COLORS, FINGER_POINTS):
+        finger_dots = np.concatenate([np.repeat(points[idx].reshape(-1, 1, 2), 2, axis=1)
+                                      for points in hands])
+        cv2.polylines(frame, list(finger_dots), False, color, 2 * POINT_RADIUS)
+    
+    return frame
+
+def draw_gesture_labels(frame, gesture_info):
+    """Dibuja el nombre del gesto, la mano y el score junto a cada mano"""
+    h, w = frame.shape[:2]
+    for info in gesture_info:
+        hand_x = int(info['landmark'].x * w)
+        hand_y = int(info['landmark'].y * h)
+        
+        text = info['text']
+        text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
+        
+        # Dibujar rectángulo de fondo
+        cv2.rectangle(frame, 
+                     (hand_x - 10, hand_y - text_size[1] - 35),
+                     (hand_x + text_size[0] + 10, hand_y - 15),
+                     (0, 0, 0), -1)
+        
+        # Mostrar el gesto
+        cv2.putText(frame, text, 
+                   (hand_x, hand_y - 20), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+        
+        # Mostrar info adicional
+        info_text = f"{info['hand']} ({info['score']:.2f})"
+        cv2.putText(frame, info_text, 
+                   (hand_x, hand_y + 20), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+
+# ==================== RECONOCEDOR ====================
+GESTURE_DISPLAY = {
+    "Thumb_Up": "Pulgar Arriba",
+    "Thumb_Down": "Pulgar Abajo",
+    "Victory": "Victoria",
+    "Closed_Fist": "Mano Cerrado",
+    "Open_Palm": "Palma Abierta",
+    "Pointing_Up": "Apuntando Arriba",
+    "ILoveYou": "Te Amo",
+    "None": "Ninguno"
+}
+
+def create_recognizer(model_path, num_hands=2, min_confidence=0.5):
+    """Crea un GestureRecognizer en modo VIDEO"""
+    base_options = python.BaseOptions(model_asset_path=model_path)
+    options = vision.GestureRecognizerOptions(
+        base_options=base_options,
+        running_mode=vision.RunningMode.VIDEO,
+        num_hands=num_hands,
+        min_hand_detection_confidence=min_confidence,
+        min_hand_presence_confidence=min_confidence,
+        min_tracking_confidence=min_confidence
+    )
+    return vision.GestureRecognizer.create_from_options(options)
+
+class LandmarkGestureRecognizer:
+    """Sólo detección de landmarks + clasificador propio (clasificador.py).
+
+    Expone la misma interfaz que GestureRecognizer (recognize_for_video y un
+    resultado con hand_landmarks, handedness y gestures), así que funciona
+    con el gating, el anotador y el resto del pipeline sin cambios.
+    """
+    def __init__(self, landmarker, classifier):
+        self.landmarker = landmarker
+        self.classifier = classifier
+    
+    def recognize_for_video(self, mp_image, timestamp_ms, classify=True):
+        """Con classify=False los gestos quedan vacíos (ver InferenceGate._run)"""
+        result = self.landmarker.detect_for_video(mp_image, timestamp_ms)
+        gestures = []
+        if classify:
+            gestures = self.classify(result.hand_landmarks, result.handedness)
+        return SimpleNamespace(hand_landmarks=result.hand_landmarks,
+                               handedness=result.handedness,
+                               gestures=gestures)
+    
+    def classify(self, hand_landmarks, handedness):
+        """Gestos de todas las manos del frame, clasificadas en un solo lote"""
+        if not hand_landmarks:
+            return []
+        landmarks = np.array([[(lm.x, lm.y, lm.z) for lm in hand]
+                              for hand in hand_landmarks], dtype=np.float32)
+        mirror = [bool(h) and h[0].category_name == "Right" for h in handedness]
+        labels, scores = self.classifier.predict(landmarks, mirror)
+        return [[SimpleNamespace(category_name=str(label), score=float(score))]
+                for label, score in zip(labels, scores)]
+    
+    def close(self):
+        self.landmarker.close()
+
+def create_landmark_recognizer(model_path, classifier, num_hands=2, min_confidence=0.5):
+    """Crea un HandLandmarker en modo VIDEO envuelto con un clasificador propio"""
+    base_options = python.BaseOptions(model_asset_path=model_path)
+    options = vision.HandLandmarkerOptions(
+        base_options=base_options,
+        running_mode=vision.RunningMode.VIDEO,
+        num_hands=num_hands,
+        min_hand_detection_confidence=min_confidence,
+        min_hand_presence_confidence=min_confidence,
+        min_tracking_confidence=min_confidence
+    )
+    landmarker = vision.HandLandmarker.create_from_options(options)
+    return LandmarkGestureRecognizer(landmarker, classifier)
+
+def select_profile(benchmark, accuracy_floor=0.9):
+    """Elige el perfil más rápido de un benchmark que cumpla el piso de exactitud.
+
+    `benchmark` es el JSON generado por benchmark_modelos.py. El perfil de
+    referencia siempre cumple (coincidencia 1.0), así que siempre hay uno.
+    """
+    candidates = [r for r in benchmark['results'] if r['agreement'] >= accuracy_floor]
+    if not candidates:
+        raise ValueError(f"Ningún perfil alcanza una coincidencia de {accuracy_floor:.0%}")
+    return max(candidates, key=lambda r: r['throughput_fps'])
+
+def build_gesture_info(recognition_result):
+    """Convierte el resultado del reconocedor en una lista de diccionarios por mano"""
+    gesture_info = []
+    if not recognition_result.hand_landmarks:
+        return gesture_info
+    
+    for hand_idx in range(len(recognition_result.hand_landmarks)):
+        hand_landmarks = recognition_result.hand_landmarks[hand_idx]
+        
+        if recognition_result.gestures and hand_idx < len(recognition_result.gestures):
+            gesture = recognition_result.gestures[hand_idx][0]
+            gesture_name = gesture.category_name
+            gesture_score = gesture.score
             
-            if idx <= 4:
-                color = FINGER_COLORS[0]
-            elif idx <= 8:
-                color = FINGER_COLORS[1]
-            elif idx <= 12:
-                color = FINGER_COLORS[2]
-            elif idx <= 16:
-                color = FINGER_COLORS[3]
-            else:
-                color = FINGER_COLORS[4]
+            handedness = "Desconocida"
+            if recognition_result.handedness and hand_idx < len(recognition_result.handedness):
+                hand_label = recognition_result.handedness[hand_idx][0].category_name
+                handedness = "Derecha" if hand_label == "Left" else "Izquierda"
             
-            cv2.circle(annotated_image, (x, y), 5, color, -1)
-            cv2.circle(annotated_image, (x, y), 5, (255, 255, 255), 1)
-    
-    return annotated_image
+            gesture_text = GESTURE_DISPLAY.get(gesture_name, gesture_name)
+            
+            gesture_info.append({
+                'text': gesture_text,
+                'gesture': gesture_name,
+                'hand': handedness,
+                'score': gesture_score,
+                'landmark': hand_landmarks[0],
+                'landmarks': np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks],
+                                      dtype=np.float32)
+            })
+    return gesture_info
 
 # ==================== THREAD 1: CAPTURA DE FRAMES ====================
-def capture_thread(shared_resources, camera_id=0):
-    """Thread para captura continua de frames desde la cámara"""
+def capture_thread(shared_resources, camera_id=0, from_file=False):
+    """Thread para captura continua de frames desde la cámara.
+
+    Con from_file=True (archivos de video) los frames se leen al ritmo de
+    CAP_PROP_FPS en lugar de tan rápido como se pueda decodificar, no se
+    reflejan como la imagen de una webcam (la mano derecha sigue siendo la
+    derecha) y el fin del archivo es una terminación normal.
+    """
     print(f"[THREAD-CAPTURE] Iniciando captura desde cámara {camera_id}...")
     
     cap = cv2.VideoCapture(camera_id)
@@ -180,24 +788,50 @@ def capture_thread(shared_resources, camera_id=0):
         return
     
     print("[THREAD-CAPTURE] Cámara abierta exitosamente")
+    shared_resources.timeline.mark("camara_abierta")
     
     prev_time = time.time()
     fps_counter = 0
+    source_fps = cap.get(cv2.CAP_PROP_FPS) if from_file else 0.0
+    frame_interval = 1.0 / (source_fps if source_fps > 0 else 30.0) if from_file else 0.0
+    next_frame = time.perf_counter()
     
     while shared_resources.running:
+        if shared_resources.resolution_changed.is_set():
+            shared_resources.resolution_changed.clear()
+            width, height = shared_resources.capture_resolution
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+            print(f"[THREAD-CAPTURE] Resolución de captura: "
+                  f"{int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))}x{int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))}")
+        
         ret, frame = cap.read()
+        trace = shared_resources.metrics.new_trace()
         
         if not ret:
-            print("[THREAD-CAPTURE] ERROR: No se pudo leer el frame")
+            if from_file:
+                print("[THREAD-CAPTURE] Fin del archivo")
+            else:
+                print("[THREAD-CAPTURE] ERROR: No se pudo leer el frame")
+                shared_resources.metrics.count_drop('read_error')
             break
         
-        frame = cv2.flip(frame, 1)
+        if not from_file:
+            # Vista de espejo, como la imagen de una webcam
+            frame = cv2.flip(frame, 1)
+        shared_resources.timeline.mark("primer_frame_capturado")
         
-        if shared_resources.processing_semaphore.acquire(blocking=False):
+        if not shared_resources.processing_ready.is_set():
+            # El reconocedor aún se está cargando: la cámara sólo se calienta
+            shared_resources.metrics.count_drop('warmup')
+        elif shared_resources.processing_semaphore.acquire(blocking=False):
             try:
-                shared_resources.set_frame(frame)
+                shared_resources.set_frame(frame, trace)
             finally:
                 pass
+        else:
+            # El hilo de procesamiento sigue ocupado: el frame se descarta
+            shared_resources.metrics.count_drop('processing_busy')
         
         # Calcular FPS de captura
         fps_counter += 1
@@ -208,28 +842,32 @@ def capture_thread(shared_resources, camera_id=0):
             fps_counter = 0
             prev_time = curr_time
         
-        time.sleep(0.001)
+        if frame_interval:
+            # Ritmo del archivo; si vamos atrasados no se acumula deuda
+            next_frame += frame_interval
+            delay = next_frame - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_frame = time.perf_counter()
+        else:
+            time.sleep(0.001)
     
     cap.release()
     print("[THREAD-CAPTURE] Thread de captura finalizado")
 
-def processing_thread(shared_resources, recognizer):
+def processing_thread(shared_resources, recognizer, gate=None, publisher=None,
+                      controller=None, recorder=None, inference_scale=1.0):
     """Thread para procesar gestos en los frames capturados"""
     print("[THREAD-PROCESS] Iniciando procesamiento de gestos...")
     
     prev_time = time.time()
     fps_counter = 0
-    
-    gesture_display = {
-        "Thumb_Up": "Pulgar Arriba",
-        "Thumb_Down": "Pulgar Abajo",
-        "Victory": "Victoria",
-        "Closed_Fist": "Mano Cerrado",
-        "Open_Palm": "Palma Abierta",
-        "Pointing_Up": "Apuntando Arriba",
-        "ILoveYou": "Te Amo",
-        "None": "Ninguno"
-    }
+    overlay_ms_avg = None
+    frame_index = 0
+    last_result = None
+    # Desfase para convertir timestamps monotónicos en hora del sistema
+    wall_offset = time.time() - time.monotonic()
     
     while shared_resources.running:
         # Esperar a que haya un nuevo frame disponible
@@ -238,7 +876,7 @@ def processing_thread(shared_resources, recognizer):
             continue
         
         # SECCIÓN CRÍTICA: Obtener frame para procesar
-        frame = shared_resources.get_frame()
+        frame, trace = shared_resources.get_frame()
         
         if frame is None:
             # SEMÁFORO: Liberar si no hay frame
@@ -249,47 +887,64 @@ def processing_thread(shared_resources, recognizer):
             # Convertir BGR a RGB
             rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
             
-            # Crear el objeto de imagen de MediaPipe
-            mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
-            
             # Calcular timestamp en milisegundos
             timestamp_ms = int(time.time() * 1000)
             
-            # Reconocer gestos
-            recognition_result = recognizer.recognize_for_video(mp_image, timestamp_ms)
+            # Con el controlador adaptativo sólo se infiere 1 de cada `stride`
+            # frames y sobre una versión reducida (los landmarks son normalizados)
+            scale = inference_scale * (controller.scale if controller is not None else 1.0)
+            stride = controller.stride if controller is not None else 1
+            inferred = last_result is None or frame_index % stride == 0
+            frame_index += 1
+            
+            # Reconocer gestos (con gating de movimiento/ROI si está activo)
+            trace.mark('inference_start')
+            if not inferred:
+                recognition_result = last_result
+            else:
+                if scale != 1.0:
+                    rgb_frame = cv2.resize(rgb_frame, None, fx=scale, fy=scale,
+                                           interpolation=cv2.INTER_AREA)
+                if gate is not None:
+                    recognition_result = gate.recognize(recognizer, rgb_frame, timestamp_ms)
+                    shared_resources.update_stats(skip_ratio=gate.skip_ratio())
+                    # El controlador debe ver la carga real: los frames omitidos
+                    # por el gating no ejecutaron el modelo
+                    inferred = gate.last_ran
+                else:
+                    mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
+                    recognition_result = recognizer.recognize_for_video(mp_image, timestamp_ms)
+                last_result = recognition_result
+            trace.mark('inference_end')
             
-            # Dibujar landmarks en el frame
-            if recognition_result.hand_landmarks:
-                annotated_image = draw_landmarks_on_image(rgb_frame, recognition_result)
-                frame = cv2.cvtColor(annotated_image, cv2.COLOR_RGB2BGR)
+            if controller is not None:
+                controller.observe(trace, inferred)
+                stats = shared_resources.get_stats()
+                controller.update(stats['processing_fps'], stats['capture_fps'])
+            
+            # Dibujar landmarks directamente sobre el frame BGR
+            overlay_start = time.perf_counter()
+            draw_landmarks_on_frame(frame, recognition_result.hand_landmarks)
+            overlay_ms = (time.perf_counter() - overlay_start) * 1000
+            overlay_ms_avg = overlay_ms if overlay_ms_avg is None else 0.9 * overlay_ms_avg + 0.1 * overlay_ms
+            shared_resources.update_stats(overlay_ms=overlay_ms_avg)
             
             # Preparar información de gestos
-            gesture_info = []
-            if recognition_result.hand_landmarks:
-                for hand_idx in range(len(recognition_result.hand_landmarks)):
-                    hand_landmarks = recognition_result.hand_landmarks[hand_idx]
-                    
-                    if recognition_result.gestures and hand_idx < len(recognition_result.gestures):
-                        gesture = recognition_result.gestures[hand_idx][0]
-                        gesture_name = gesture.category_name
-                        gesture_score = gesture.score
-                        
-                        handedness = "Desconocida"
-                        if recognition_result.handedness and hand_idx < len(recognition_result.handedness):
-                            hand_label = recognition_result.handedness[hand_idx][0].category_name
-                            handedness = "Derecha" if hand_label == "Left" else "Izquierda"
-                        
-                        gesture_text = gesture_display.get(gesture_name, gesture_name)
-                        
-                        gesture_info.append({
-                            'text': gesture_text,
-                            'hand': handedness,
-                            'score': gesture_score,
-                            'landmark': hand_landmarks[0]
-                        })
+            gesture_info = build_gesture_info(recognition_result)
+            
+            trace.mark('annotate')
             
             # SECCIÓN CRÍTICA: Guardar resultados procesados
-            shared_resources.set_results(frame, gesture_info)
+            shared_resources.set_results(frame, gesture_info, trace)
+            shared_resources.timeline.mark("primer_frame_procesado")
+            
+            # Publicar eventos de inicio/fin de gesto a otros procesos
+            if publisher is not None:
+                publisher.publish(gesture_info, trace.capture)
+            
+            # Guardar los landmarks en el registro binario
+            if recorder is not None:
+                recorder.append_frame(gesture_info, trace.capture + wall_offset)
             
             # Calcular FPS de procesamiento
             fps_counter += 1
@@ -302,6 +957,7 @@ def processing_thread(shared_resources, recognizer):
                 
         except Exception as e:
             print(f"[THREAD-PROCESS] ERROR en procesamiento: {e}")
+            shared_resources.metrics.count_drop('processing_error')
         finally:
             # SEMÁFORO: Liberar para permitir nueva captura
             shared_resources.processing_semaphore.release()
@@ -309,7 +965,61 @@ def processing_thread(shared_resources, recognizer):
     print("[THREAD-PROCESS] Thread de procesamiento finalizado")
 
 # ==================== MAIN: VISUALIZACIÓN ====================
+def parse_args():
+    parser = argparse.ArgumentParser(description="Detector de gestos con hilos")
+    parser.add_argument("--camera", type=int, default=0, help="ID de la cámara")
+    parser.add_argument("--no-gate", action="store_true",
+                        help="Ejecutar el reconocedor en todos los frames")
+    parser.add_argument("--motion-threshold", type=float, default=3.0,
+                        help="Diferencia media (0-255) bajo la cual se omite la inferencia")
+    parser.add_argument("--max-reuse", type=int, default=4,
+                        help="Máximo de frames consecutivos sin ejecutar el modelo")
+    parser.add_argument("--publish", nargs="?", const=DEFAULT_SOCKET_PATH, default=None,
+                        metavar="SOCKET",
+                        help=f"Publicar eventos de gestos en un socket Unix (por defecto {DEFAULT_SOCKET_PATH})")
+    parser.add_argument("--model-dir", default=None,
+                        help="Directorio de caché del modelo (por defecto $GESTOS_MODEL_DIR o el actual)")
+    parser.add_argument("--model-sha256", default=None,
+                        help="SHA-256 esperado del modelo")
+    parser.add_argument("--offline", action="store_true",
+                        help="No descargar el modelo; fallar si no está en caché")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="Ajustar resolución, escala y stride de inferencia según la carga")
+    parser.add_argument("--target-fps", type=float, default=15.0,
+                        help="FPS de procesamiento objetivo del control adaptativo")
+    parser.add_argument("--target-latency-ms", type=float, default=150.0,
+                        help="p95 objetivo de la latencia captura -> fin de inferencia")
+    parser.add_argument("--control-log", default=None,
+                        help="Archivo JSONL donde registrar las decisiones del control adaptativo")
+    parser.add_argument("--record", default=None, metavar="ARCHIVO",
+                        help="Guardar gestos y landmarks en un registro binario (.lmlog)")
+    parser.add_argument("--classifier", default=None, metavar="MODELO.npz",
+                        help="Usar sólo detección de landmarks y este clasificador propio "
+                             "(ver clasificador.py) en lugar del GestureRecognizer")
+    parser.add_argument("--profile", default=None, metavar="BENCHMARK.json",
+                        help="Usar el perfil más rápido de un benchmark de benchmark_modelos.py "
+                             "que cumpla --accuracy-floor")
+    parser.add_argument("--accuracy-floor", type=float, default=0.9,
+                        help="Coincidencia mínima con el perfil de referencia (0-1)")
+    parser.add_argument("--headless", action="store_true",
+                        help="No abrir ventana (sin X11); salir con Ctrl+C")
+    parser.add_argument("--preview-port", type=int, default=None,
+                        help="Servir la vista previa como stream MJPEG en este puerto")
+    parser.add_argument("--preview-host", default="127.0.0.1",
+                        help="Dirección donde escucha la vista previa")
+    parser.add_argument("--jpeg-quality", type=int, default=80,
+                        help="Calidad JPEG de la vista previa (0-100)")
+    parser.add_argument("--preview-fps", type=float, default=15.0,
+                        help="FPS máximos de la vista previa")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="Exponer métricas en http://127.0.0.1:PUERTO/metrics")
+    parser.add_argument("--debounce-frames", type=int, default=3,
+                        help="Frames consecutivos necesarios para iniciar/terminar un gesto")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    
     print("=" * 60)
     print("Detector de Gestos ")
     print("=" * 60)
@@ -328,106 +1038,173 @@ def main():
     print("Presiona 'q' para salir")
     print()
     
-    # Descargar el modelo
-    model_path = download_model()
-    
-    # Configurar el reconocedor de gestos
-    base_options = python.BaseOptions(model_asset_path=model_path)
-    options = vision.GestureRecognizerOptions(
-        base_options=base_options,
-        running_mode=vision.RunningMode.VIDEO,
-        num_hands=2,
-        min_hand_detection_confidence=0.5,
-        min_hand_presence_confidence=0.5,
-        min_tracking_confidence=0.5
-    )
-    recognizer = vision.GestureRecognizer.create_from_options(options)
-    
-    # Crear recursos compartidos
+    # Crear recursos compartidos (el timeline de arranque empieza aquí)
     shared_resources = SharedResources()
     
-    # Crear y arrancar threads
+    # La cámara se abre y se calienta mientras se carga el modelo
     thread_capture = threading.Thread(
         target=capture_thread, 
-        args=(shared_resources, 0),
+        args=(shared_resources, args.camera),
         name="CaptureThread"
     )
+    thread_capture.start()
+    
+    inference_scale = 1.0
+    try:
+        if args.classifier:
+            # Ruta rápida: sólo landmarks + clasificador NumPy
+            classifier = LandmarkClassifier.load(args.classifier)
+            model_path = download_model(args.model_dir, args.offline, args.model_sha256,
+                                        HAND_LANDMARKER_URL, HAND_LANDMARKER_NAME)
+            shared_resources.timeline.mark("modelo_verificado")
+            def make_recognizer():
+                return create_landmark_recognizer(model_path, classifier)
+            print(f"[MAIN] Clasificador propio: {', '.join(map(str, classifier.classes))}")
+        elif args.profile:
+            # Perfil elegido a partir de un benchmark en este hardware
+            with open(args.profile, encoding="utf-8") as f:
+                benchmark = json.load(f)
+            profile = select_profile(benchmark, args.accuracy_floor)
+            if benchmark.get('host') != platform.node():
+                print(f"[MAIN] AVISO: el benchmark se hizo en {benchmark.get('host')}")
+            if not verify_model(profile['model']):
+                raise RuntimeError(f"Modelo del perfil no válido: {profile['model']}")
+            shared_resources.timeline.mark("modelo_verificado")
+            def make_recognizer():
+                return create_recognizer(profile['model'], profile['num_hands'],
+                                         profile['min_confidence'])
+            inference_scale = profile['scale']
+            print(f"[MAIN] Perfil '{profile['name']}': {profile['throughput_fps']:.1f} FPS, "
+                  f"coincidencia {profile['agreement']:.1%}")
+        else:
+            # Descargar/verificar el modelo
+            model_path = download_model(args.model_dir, args.offline, args.model_sha256)
+            shared_resources.timeline.mark("modelo_verificado")
+            
+            # Configurar el reconocedor de gestos
+            def make_recognizer():
+                return create_recognizer(model_path)
+        recognizer = make_recognizer()
+        shared_resources.timeline.mark("reconocedor_listo")
+    except Exception as e:
+        print(f"[MAIN] ERROR cargando el modelo: {e}")
+        shared_resources.running = False
+        thread_capture.join(timeout=2)
+        return
     
+    publisher = None
+    if args.publish:
+        publisher = GesturePublisher(args.publish, min_frames=args.debounce_frames)
+        print(f"[MAIN] Publicando eventos de gestos en {args.publish}")
+    
+    metrics_server = None
+    if args.metrics_port:
+        shared_resources.metrics.add_gauges(shared_resources.get_stats)
+        metrics_server = MetricsServer(shared_resources.metrics, args.metrics_port)
+        metrics_server.start()
+        print(f"[MAIN] Métricas en http://127.0.0.1:{args.metrics_port}/metrics")
+    
+    gate = None
+    if not args.no_gate:
+        gate = InferenceGate(motion_threshold=args.motion_threshold,
+                             max_reuse=args.max_reuse)
+    
+    recorder = None
+    if args.record:
+        recorder = LandmarkLogWriter(args.record)
+        print(f"[MAIN] Registrando landmarks en {args.record}")
+    
+    streamer = None
+    if args.preview_port:
+        streamer = MJPEGStreamer(args.preview_port, args.preview_host,
+                                 args.jpeg_quality, args.preview_fps)
+        streamer.start()
+        print(f"[MAIN] Vista previa en http://{args.preview_host}:{args.preview_port}/")
+    
+    controller = None
+    if args.adaptive:
+        controller = AdaptiveController(shared_resources, args.target_fps,
+                                        args.target_latency_ms, log_path=args.control_log)
+    
+    # Crear y arrancar el hilo de procesamiento
     thread_process = threading.Thread(
         target=processing_thread, 
-        args=(shared_resources, recognizer),
+        args=(shared_resources, recognizer, gate, publisher, controller, recorder,
+              inference_scale),
         name="ProcessingThread"
     )
     
-    print("\n[MAIN] Iniciando threads...")
-    thread_capture.start()
+    print("\n[MAIN] Iniciando hilo de procesamiento...")
     thread_process.start()
+    shared_resources.processing_ready.set()
+    if gate is not None:
+        # Segunda instancia del modelo para los recortes ROI: se carga después
+        # de que el primer frame ya puede procesarse, no en el arranque
+        gate.load_roi_recognizer(make_recognizer)
     print("[MAIN] Threads iniciados\n")
     
     # Loop principal de visualización
-    while shared_resources.running:
-        # SECCIÓN CRÍTICA: Obtener frame procesado y resultados
-        processed_frame, gesture_info = shared_resources.get_results()
-        
-        if processed_frame is not None:
-            frame = processed_frame.copy()
-            h, w, _ = frame.shape
+    try:
+        while shared_resources.running:
+            # SECCIÓN CRÍTICA: Obtener frame procesado y resultados
+            processed_frame, gesture_info = shared_resources.get_results()
             
-            # Obtener estadísticas
-            stats = shared_resources.get_stats()
+            # En modo headless sólo se trabaja cuando hay un frame nuevo
+            if args.headless and shared_resources.processed_displayed:
+                time.sleep(0.005)
+                continue
             
-            # Mostrar información de threads
-            y_pos = 30
-            cv2.putText(frame, f"FPS Captura: {stats['capture_fps']:.1f}", 
-                       (10, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-            y_pos += 30
-            cv2.putText(frame, f"FPS Proceso: {stats['processing_fps']:.1f}", 
-                       (10, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
-            y_pos += 30
-            cv2.putText(frame, f"Capturados: {stats['frames_captured']}", 
-                       (10, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
-            y_pos += 30
-            cv2.putText(frame, f"Procesados: {stats['frames_processed']}", 
-                       (10, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
-            
-            # Mostrar información de gestos detectados
-            if gesture_info:
-                num_hands = len(gesture_info)
-                cv2.putText(frame, f"Manos: {num_hands}", (10, 150), 
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+            if processed_frame is not None:
+                frame = processed_frame.copy()
+                h, w, _ = frame.shape
                 
-                for info in gesture_info:
-                    hand_x = int(info['landmark'].x * w)
-                    hand_y = int(info['landmark'].y * h)
-                    
-                    text = info['text']
-                    text_size = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 0.8, 2)[0]
-                    
-                    # Dibujar rectángulo de fondo
-                    cv2.rectangle(frame, 
-                                 (hand_x - 10, hand_y - text_size[1] - 35),
-                                 (hand_x + text_size[0] + 10, hand_y - 15),
-                                 (0, 0, 0), -1)
-                    
-                    # Mostrar el gesto
-                    cv2.putText(frame, text, 
-                               (hand_x, hand_y - 20), 
+                # Obtener estadísticas
+                stats = shared_resources.get_stats()
+                
+                # Mostrar información de threads
+                y_pos = 30
+                cv2.putText(frame, f"FPS Captura: {stats['capture_fps']:.1f}", 
+                           (10, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                y_pos += 30
+                cv2.putText(frame, f"FPS Proceso: {stats['processing_fps']:.1f}", 
+                           (10, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+                y_pos += 30
+                cv2.putText(frame, f"Capturados: {stats['frames_captured']}", 
+                           (10, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+                y_pos += 30
+                cv2.putText(frame, f"Procesados: {stats['frames_processed']}", 
+                           (10, y_pos), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
+                if gate is not None:
+                    cv2.putText(frame, f"Omitidos: {stats['skip_ratio'] * 100:.0f}%", 
+                               (w - 170, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 200, 255), 2)
+                
+                # Mostrar información de gestos detectados
+                if gesture_info:
+                    num_hands = len(gesture_info)
+                    cv2.putText(frame, f"Manos: {num_hands}", (10, 150), 
                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
                     
-                    # Mostrar info adicional
-                    info_text = f"{info['hand']} ({info['score']:.2f})"
-                    cv2.putText(frame, info_text, 
-                               (hand_x, hand_y + 20), 
-                               cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
+                    draw_gesture_labels(frame, gesture_info)
+                
+                # Mostrar el frame (ventana X11 y/o stream MJPEG)
+                if not args.headless:
+                    cv2.imshow('Detector de Gestos ', frame)
+                if streamer is not None:
+                    streamer.submit(frame)
+                shared_resources.mark_displayed()
+                if shared_resources.timeline.mark("primer_frame_mostrado"):
+                    print("[MAIN] Timeline de arranque:")
+                    print(shared_resources.timeline.report())
             
-            # Mostrar el frame
-            cv2.imshow('Detector de Gestos ', frame)
+            # Verificar si se presiona 'q'
+            if not args.headless and cv2.waitKey(1) & 0xFF == ord('q'):
+                print("\n[MAIN] Señal de salida recibida")
+                shared_resources.running = False
+                break
         
-        # Verificar si se presiona 'q'
-        if cv2.waitKey(1) & 0xFF == ord('q'):
-            print("\n[MAIN] Señal de salida recibida")
-            shared_resources.running = False
-            break
+    except KeyboardInterrupt:
+        print("\n[MAIN] Señal de salida recibida")
+        shared_resources.running = False
     
     # Esperar a que los threads terminen
     print("[MAIN] Esperando finalización de threads...")
@@ -435,8 +1212,21 @@ def main():
     thread_process.join(timeout=2)
     
     # Limpiar
-    cv2.destroyAllWindows()
+    if not args.headless:
+        cv2.destroyAllWindows()
+    if streamer is not None:
+        streamer.stop()
     recognizer.close()
+    if gate is not None:
+        gate.close()
+    if publisher is not None:
+        publisher.close()
+    if metrics_server is not None:
+        metrics_server.stop()
+    if controller is not None:
+        controller.close()
+    if recorder is not None:
+        recorder.close()
     
     # Mostrar estadísticas finales
     final_stats = shared_resources.get_stats()
@@ -446,6 +1236,39 @@ def main():
     print(f"  Frames procesados: {final_stats['frames_processed']}")
     print(f"  FPS de captura: {final_stats['capture_fps']:.2f}")
     print(f"  FPS de procesamiento: {final_stats['processing_fps']:.2f}")
+    print(f"  Costo del overlay: {final_stats['overlay_ms']:.2f} ms/frame")
+    first_processed = shared_resources.timeline.elapsed("primer_frame_procesado")
+    if first_processed is not None:
+        print(f"  Tiempo hasta el primer frame procesado: {first_processed * 1000:.0f} ms")
+    summary = shared_resources.metrics.summary()
+    for stage, values in summary['stages'].items():
+        if values['count']:
+            print(f"  Latencia {stage}: p50={values['p50_ms']:.1f} ms "
+                  f"p95={values['p95_ms']:.1f} ms p99={values['p99_ms']:.1f} ms")
+    for reason, count in summary['drops'].items():
+        print(f"  Frames descartados ({reason}): {count}")
+    if gate is not None:
+        print(f"  Inferencias omitidas: {gate.frames_skipped}/{gate.frames_total} "
+              f"({gate.skip_ratio() * 100:.1f}%)")
+        print(f"  Inferencias ROI / completas: {gate.frames_roi} / {gate.frames_full}")
+    if controller is not None:
+        (cw, ch), scale, stride = QUALITY_LEVELS[controller.level]
+        print(f"  Control adaptativo: {len(controller.decisions)} cambios, nivel final "
+              f"{controller.level} ({cw}x{ch}, escala {scale}, stride {stride})")
+    if streamer is not None:
+        preview = streamer.get_stats()
+        print(f"  Vista previa: {preview['frames_encoded']} JPEG "
+              f"({preview['encode_avg_ms']:.1f} ms promedio), omitidos sin cliente: "
+              f"{preview['skipped_no_client']}, por tasa: {preview['skipped_rate']}, "
+              f"por carga: {preview['skipped_busy']}")
+    if recorder is not None:
+        print(f"  Registros de landmarks guardados: {recorder.records_written}")
+    if publisher is not None:
+        pub_stats = publisher.get_stats()
+        print(f"  Eventos publicados: {pub_stats['events_sent']} "
+              f"(descartados: {pub_stats['events_dropped']})")
+        print(f"  Costo de publicación: {pub_stats['publish_avg_us']:.1f} us promedio, "
+              f"{pub_stats['publish_max_us']:.1f} us máximo")
     print("=" * 60)
     print("[MAIN] Programa finalizado")
 
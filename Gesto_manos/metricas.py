@@ -0,0 +1,188 @@
+"""Trazas de latencia por frame y endpoint HTTP de métricas (formato texto de Prometheus).
+
+Cada frame capturado lleva un FrameTrace con los instantes (time.monotonic())
+de captura, salida de la cola, inicio/fin de inferencia, anotación y
+visualización. PipelineMetrics acumula las latencias por etapa en ventanas
+deslizantes (p50/p95/p99) y cuenta los frames descartados por motivo.
+"""
+import threading
+import time
+import itertools
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+# Etapas medidas: nombre -> (instante inicial, instante final) del FrameTrace
+STAGES = {
+    'queue': ('capture', 'dequeue'),
+    'inference': ('inference_start', 'inference_end'),
+    'annotate': ('inference_end', 'annotate'),
+    'display': ('annotate', 'display'),
+    'glass_to_glass': ('capture', 'display'),
+}
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class FrameTrace:
+    """Timestamps de un frame a lo largo del pipeline"""
+    __slots__ = ('frame_id', 'capture', 'dequeue', 'inference_start',
+                 'inference_end', 'annotate', 'display')
+
+    def __init__(self, frame_id, capture):
+        self.frame_id = frame_id
+        self.capture = capture
+        self.dequeue = None
+        self.inference_start = None
+        self.inference_end = None
+        self.annotate = None
+        self.display = None
+
+    def mark(self, stage):
+        setattr(self, stage, time.monotonic())
+
+
+class LatencyWindow:
+    """Ventana deslizante de latencias (segundos) con contador y suma acumulados"""
+    def __init__(self, size=2048):
+        self.values = deque(maxlen=size)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self):
+        if not self.values:
+            return [float('nan')] * len(QUANTILES)
+        return list(np.quantile(np.fromiter(self.values, dtype=np.float64), QUANTILES))
+
+
+class PipelineMetrics:
+    """Métricas del pipeline compartidas entre hilos (protegidas con mutex)"""
+    def __init__(self, window=2048):
+        self.lock = threading.Lock()
+        self.ids = itertools.count()
+        self.stages = {name: LatencyWindow(window) for name in STAGES}
+        self.drops = {}
+        self.gauge_sources = []
+
+    def new_trace(self, capture_ts=None):
+        return FrameTrace(next(self.ids), capture_ts if capture_ts is not None else time.monotonic())
+
+    def count_drop(self, reason, n=1):
+        with self.lock:
+            self.drops[reason] = self.drops.get(reason, 0) + n
+
+    def observe_trace(self, trace):
+        """Registra todas las etapas completas de un frame ya visualizado"""
+        with self.lock:
+            for name, (start, end) in STAGES.items():
+                t0 = getattr(trace, start)
+                t1 = getattr(trace, end)
+                if t0 is not None and t1 is not None:
+                    self.stages[name].observe(t1 - t0)
+
+    def add_gauges(self, source):
+        """Registra una función que devuelve {nombre: valor} para exportar como gauges"""
+        self.gauge_sources.append(source)
+
+    def summary(self):
+        """Percentiles (ms) por etapa y descartes por motivo"""
+        with self.lock:
+            stages = {}
+            for name, window in self.stages.items():
+                p50, p95, p99 = window.quantiles()
+                stages[name] = {'p50_ms': p50 * 1000, 'p95_ms': p95 * 1000,
+                                'p99_ms': p99 * 1000, 'count': window.count}
+            return {'stages': stages, 'drops': dict(self.drops)}
+
+    def render_prometheus(self):
+        """Genera el texto de exposición de Prometheus"""
+        lines = []
+        with self.lock:
+            lines.append("# HELP gestos_stage_latency_seconds Latencia por etapa del pipeline")
+            lines.append("# TYPE gestos_stage_latency_seconds summary")
+            for name, window in self.stages.items():
+                for q, value in zip(QUANTILES, window.quantiles()):
+                    lines.append(f'gestos_stage_latency_seconds{{stage="{name}",quantile="{q}"}} {value:.6f}')
+                lines.append(f'gestos_stage_latency_seconds_sum{{stage="{name}"}} {window.total:.6f}')
+                lines.append(f'gestos_stage_latency_seconds_count{{stage="{name}"}} {window.count}')
+
+            lines.append("# HELP gestos_frames_dropped_total Frames descartados por motivo")
+            lines.append("# TYPE gestos_frames_dropped_total counter")
+            for reason, count in sorted(self.drops.items()):
+                lines.append(f'gestos_frames_dropped_total{{reason="{reason}"}} {count}')
+
+        for source in self.gauge_sources:
+            for name, value in source().items():
+                lines.append(f"# TYPE gestos_{name} gauge")
+                lines.append(f"gestos_{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+class StartupTimeline:
+    """Instantes de arranque relativos al inicio del programa (sólo la primera vez)"""
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.t0 = time.monotonic()
+        self.events = []
+        self.labels = set()
+
+    def mark(self, label):
+        with self.lock:
+            if label in self.labels:
+                return False
+            self.labels.add(label)
+            self.events.append((label, time.monotonic() - self.t0))
+            return True
+
+    def elapsed(self, label):
+        with self.lock:
+            for name, t in self.events:
+                if name == label:
+                    return t
+        return None
+
+    def elapsed_now(self):
+        return time.monotonic() - self.t0
+
+    def report(self):
+        with self.lock:
+            events = sorted(self.events, key=lambda e: e[1])
+        return "\n".join(f"  {t * 1000:8.1f} ms  {label}" for label, t in events)
+
+
+class MetricsServer:
+    """Servidor HTTP local que expone /metrics en un hilo daemon"""
+    def __init__(self, metrics, port, host="127.0.0.1"):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       name="MetricsServer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
@@ -0,0 +1,279 @@
+"""Detección de gestos con varias cámaras y un pool de inferencia compartido.
+
+Cada fuente (cámara, archivo o URL) tiene su propio hilo de captura y su
+propio SharedResources (frame, semáforo, métricas), igual que en gestos.py,
+y su propio GestureRecognizer: en modo VIDEO los timestamps deben crecer de
+forma monótona por flujo, así que no se puede compartir entre cámaras.
+
+Los hilos del pool toman trabajo de un planificador justo ponderado (start-
+time fair queuing): cada flujo acumula tiempo virtual = costo de inferencia /
+peso, y siempre se atiende el flujo listo con menor tiempo virtual, de modo
+que una cámara muy activa no deja sin servicio a las demás.
+
+Uso:
+    python3 multicamara.py --sources 0 1 video.mp4 --weights 2 1 1 --workers 2
+    python3 multicamara.py --sources 0 1 --headless
+"""
+import os
+import math
+import time
+import argparse
+import threading
+
+import cv2
+import numpy as np
+import mediapipe as mp
+
+from gestos import (SharedResources, capture_thread, create_recognizer, download_model,
+                    build_gesture_info, draw_landmarks_on_frame, draw_gesture_labels)
+
+
+class CameraStream:
+    """Estado de un flujo: recursos compartidos, reconocedor y tiempo virtual"""
+    def __init__(self, stream_id, source, weight, model_path):
+        self.stream_id = stream_id
+        self.source = source
+        self.weight = weight
+        self.shared = SharedResources()
+        self.recognizer = create_recognizer(model_path)
+        self.virtual_time = 0.0
+        self.last_timestamp_ms = -1
+        self.inference_time = 0.0
+
+        # Para calcular los FPS de procesamiento por flujo
+        self.fps_frames = 0
+        self.fps_time = time.monotonic()
+
+        self.thread = threading.Thread(target=stream_capture, args=(self,),
+                                       name=f"Capture-{stream_id}", daemon=True)
+
+
+def stream_capture(stream):
+    """Hilo de captura de un flujo (ver capture_thread para los archivos)"""
+    is_file = isinstance(stream.source, str) and os.path.isfile(stream.source)
+    capture_thread(stream.shared, stream.source, from_file=is_file)
+    # Fin del archivo o cámara desconectada: el flujo ya no tendrá frames nuevos
+    stream.shared.running = False
+
+
+class FairScheduler:
+    """Planificador justo ponderado entre flujos con frames pendientes"""
+    def __init__(self, streams):
+        self.lock = threading.Lock()
+        self.streams = streams
+        self.in_flight = set()
+        self.virtual_clock = 0.0
+
+    def next_stream(self):
+        """Reserva el flujo listo con menor tiempo virtual (o None si no hay)"""
+        with self.lock:
+            ready = [s for s in self.streams
+                     if s.stream_id not in self.in_flight and s.shared.new_frame_available]
+            if not ready:
+                return None
+            # Un flujo que estuvo inactivo no acumula crédito
+            for s in ready:
+                s.virtual_time = max(s.virtual_time, self.virtual_clock)
+            stream = min(ready, key=lambda s: s.virtual_time)
+            self.virtual_clock = stream.virtual_time
+            self.in_flight.add(stream.stream_id)
+            return stream
+
+    def finish(self, stream, cost):
+        with self.lock:
+            stream.virtual_time += cost / stream.weight
+            self.in_flight.discard(stream.stream_id)
+
+
+def process_stream_frame(stream, headless):
+    """Procesa el frame pendiente de un flujo (mismo flujo que processing_thread)"""
+    shared = stream.shared
+    frame, trace = shared.get_frame()
+    if frame is None:
+        shared.processing_semaphore.release()
+        return 0.0
+
+    start = time.perf_counter()
+    try:
+        rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+
+        # Timestamps monótonos por flujo
+        timestamp_ms = max(int(trace.capture * 1000), stream.last_timestamp_ms + 1)
+        stream.last_timestamp_ms = timestamp_ms
+
+        trace.mark('inference_start')
+        mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=rgb_frame)
+        result = stream.recognizer.recognize_for_video(mp_image, timestamp_ms)
+        trace.mark('inference_end')
+
+        draw_landmarks_on_frame(frame, result.hand_landmarks)
+        gesture_info = build_gesture_info(result)
+        trace.mark('annotate')
+
+        shared.set_results(frame, gesture_info, trace)
+        if headless:
+            # Sin ventana el frame se da por entregado al terminar de anotarlo
+            shared.mark_displayed()
+    except Exception as e:
+        print(f"[POOL] ERROR en flujo {stream.stream_id}: {e}")
+        shared.metrics.count_drop('processing_error')
+    finally:
+        shared.processing_semaphore.release()
+
+    cost = time.perf_counter() - start
+    stream.inference_time += cost
+    return cost
+
+
+def inference_worker(scheduler, running, headless):
+    """Hilo del pool: atiende flujos según el planificador"""
+    while running.is_set():
+        stream = scheduler.next_stream()
+        if stream is None:
+            time.sleep(0.002)
+            continue
+        cost = process_stream_frame(stream, headless)
+        scheduler.finish(stream, cost)
+
+
+def update_stream_fps(streams):
+    now = time.monotonic()
+    for stream in streams:
+        elapsed = now - stream.fps_time
+        if elapsed >= 1.0:
+            processed = stream.shared.frames_processed
+            stream.shared.update_stats(processing_fps=(processed - stream.fps_frames) / elapsed)
+            stream.fps_frames = processed
+            stream.fps_time = now
+
+
+def compose_grid(streams, cell_size):
+    """Une los últimos frames procesados de cada flujo en una cuadrícula"""
+    cols = math.ceil(math.sqrt(len(streams)))
+    rows = math.ceil(len(streams) / cols)
+    cw, ch = cell_size
+    grid = np.zeros((rows * ch, cols * cw, 3), dtype=np.uint8)
+
+    for i, stream in enumerate(streams):
+        frame, gesture_info = stream.shared.get_results()
+        if frame is None:
+            continue
+        cell = cv2.resize(frame, cell_size, interpolation=cv2.INTER_AREA)
+        if gesture_info:
+            draw_gesture_labels(cell, gesture_info)
+        stats = stream.shared.get_stats()
+        cv2.putText(cell, f"{stream.stream_id} | {stats['processing_fps']:.1f} FPS",
+                    (10, 25), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 0), 2)
+        r, c = divmod(i, cols)
+        grid[r * ch:(r + 1) * ch, c * cw:(c + 1) * cw] = cell
+        stream.shared.mark_displayed()
+    return grid
+
+
+def print_stream_stats(streams):
+    for stream in streams:
+        stats = stream.shared.get_stats()
+        summary = stream.shared.metrics.summary()
+        g2g = summary['stages']['glass_to_glass']
+        inference = summary['stages']['inference']
+        drops = ", ".join(f"{k}={v}" for k, v in sorted(summary['drops'].items())) or "ninguno"
+        print(f"  [{stream.stream_id}] captura {stats['capture_fps']:.1f} FPS | "
+              f"proceso {stats['processing_fps']:.1f} FPS | "
+              f"inferencia p95 {inference['p95_ms']:.1f} ms | "
+              f"glass-to-glass p50/p95 {g2g['p50_ms']:.1f}/{g2g['p95_ms']:.1f} ms | "
+              f"descartes: {drops}")
+
+
+def parse_source(value):
+    return int(value) if value.isdigit() else value
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Detector de gestos multi-cámara")
+    parser.add_argument("--sources", nargs="+", default=["0"],
+                        help="Cámaras (índice), archivos o URLs")
+    parser.add_argument("--weights", nargs="+", type=float, default=None,
+                        help="Peso de cada fuente en el planificador (por defecto 1)")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="Hilos del pool de inferencia")
+    parser.add_argument("--headless", action="store_true",
+                        help="No mostrar ventana; sólo estadísticas por consola")
+    parser.add_argument("--cell-size", type=int, nargs=2, default=[480, 360],
+                        metavar=("ANCHO", "ALTO"), help="Tamaño de cada celda de la cuadrícula")
+    parser.add_argument("--stats-interval", type=float, default=5.0,
+                        help="Segundos entre estadísticas en modo headless")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    weights = args.weights or [1.0] * len(args.sources)
+    if len(weights) != len(args.sources):
+        raise SystemExit("--weights debe tener un valor por fuente")
+
+    model_path = download_model()
+    streams = [CameraStream(f"cam{i}", parse_source(src), w, model_path)
+               for i, (src, w) in enumerate(zip(args.sources, weights))]
+
+    print("=" * 60)
+    print(f"Fuentes: {len(streams)} | Hilos de inferencia: {args.workers} | "
+          f"{'Headless' if args.headless else 'Cuadrícula'}")
+    for stream in streams:
+        print(f"  {stream.stream_id}: {stream.source} (peso {stream.weight})")
+    print("=" * 60)
+
+    for stream in streams:
+        stream.shared.processing_ready.set()
+        stream.thread.start()
+
+    running = threading.Event()
+    running.set()
+    scheduler = FairScheduler(streams)
+    workers = [threading.Thread(target=inference_worker, args=(scheduler, running, args.headless),
+                                name=f"Inference-{i}", daemon=True)
+               for i in range(args.workers)]
+    for worker in workers:
+        worker.start()
+
+    last_stats = time.monotonic()
+    try:
+        while any(s.shared.running for s in streams):
+            update_stream_fps(streams)
+            if args.headless:
+                time.sleep(0.1)
+                if time.monotonic() - last_stats >= args.stats_interval:
+                    print_stream_stats(streams)
+                    last_stats = time.monotonic()
+                continue
+
+            cv2.imshow("Detector de Gestos - Multi-camara", compose_grid(streams, tuple(args.cell_size)))
+            if cv2.waitKey(1) & 0xFF == ord('q'):
+                break
+    except KeyboardInterrupt:
+        pass
+
+    print("\n[MAIN] Deteniendo flujos...")
+    for stream in streams:
+        stream.shared.running = False
+    running.clear()
+    for thread in [s.thread for s in streams] + workers:
+        thread.join(timeout=2)
+    if not args.headless:
+        cv2.destroyAllWindows()
+
+    print("=" * 60)
+    print("ESTADÍSTICAS FINALES POR FLUJO:")
+    print_stream_stats(streams)
+    total_inference = sum(s.inference_time for s in streams) or 1.0
+    for stream in streams:
+        share = stream.inference_time / total_inference
+        print(f"  [{stream.stream_id}] frames procesados: {stream.shared.frames_processed} | "
+              f"uso del pool: {share:.0%} (peso {stream.weight})")
+    print("=" * 60)
+
+    for stream in streams:
+        stream.recognizer.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""Vista previa headless: stream MJPEG por HTTP en lugar de cv2.imshow.
+
+Los frames anotados se codifican a JPEG en un pool pequeño de hilos
+(cv2.imencode libera el GIL) y se sirven como multipart/x-mixed-replace,
+que cualquier navegador muestra como video. Si no hay ningún cliente
+conectado no se codifica nada; además se limita la tasa de frames y se
+descarta el frame si todos los codificadores están ocupados.
+
+    http://127.0.0.1:PUERTO/          página con el stream
+    http://127.0.0.1:PUERTO/stream    stream MJPEG
+    http://127.0.0.1:PUERTO/snapshot.jpg  último frame
+"""
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import cv2
+
+BOUNDARY = "frame"
+INDEX_HTML = b"""<!doctype html><html><head><title>Detector de Gestos</title></head>
+<body style="margin:0;background:#000"><img src="/stream" style="max-width:100%"></body></html>"""
+
+
+class MJPEGStreamer:
+    """Codifica frames en un pool de hilos y los publica a los clientes HTTP"""
+    def __init__(self, port, host="127.0.0.1", quality=80, max_fps=15.0, workers=2):
+        self.quality = quality
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.workers = workers
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="JPEGEncoder")
+
+        # Último JPEG publicado (sección crítica)
+        self.cond = threading.Condition()
+        self.jpeg = None
+        self.jpeg_seq = -1
+        self.clients = 0
+        self.running = True
+
+        self.submit_seq = 0
+        self.in_flight = 0
+        self.last_submit = 0.0
+
+        # Estadísticas
+        self.frames_encoded = 0
+        self.skipped_no_client = 0
+        self.skipped_rate = 0
+        self.skipped_busy = 0
+        self.encode_time = 0.0
+
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       name="MJPEGServer", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def submit(self, frame):
+        """Envía un frame BGR a codificar; devuelve False si se descartó"""
+        with self.cond:
+            if self.clients == 0:
+                self.skipped_no_client += 1
+                return False
+            now = time.monotonic()
+            if now - self.last_submit < self.min_interval:
+                self.skipped_rate += 1
+                return False
+            if self.in_flight >= self.workers:
+                self.skipped_busy += 1
+                return False
+            self.in_flight += 1
+            self.last_submit = now
+            seq = self.submit_seq
+            self.submit_seq += 1
+        self.executor.submit(self._encode, frame, seq)
+        return True
+
+    def _encode(self, frame, seq):
+        start = time.perf_counter()
+        ok, buffer = False, None
+        try:
+            ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        finally:
+            # Aunque imencode falle, el hueco de codificación debe liberarse
+            with self.cond:
+                self.in_flight -= 1
+                self.encode_time += time.perf_counter() - start
+                # Un codificador más lento no debe publicar un frame más viejo
+                if ok and seq > self.jpeg_seq:
+                    self.jpeg = buffer.tobytes()
+                    self.jpeg_seq = seq
+                    self.frames_encoded += 1
+                    self.cond.notify_all()
+
+    def _wait_frame(self, last_seq, timeout=1.0):
+        with self.cond:
+            self.cond.wait_for(lambda: self.jpeg_seq > last_seq or not self.running, timeout)
+            return self.jpeg, self.jpeg_seq
+
+    def get_stats(self):
+        with self.cond:
+            avg = self.encode_time / self.frames_encoded if self.frames_encoded else 0.0
+            return {
+                'clients': self.clients,
+                'frames_encoded': self.frames_encoded,
+                'skipped_no_client': self.skipped_no_client,
+                'skipped_rate': self.skipped_rate,
+                'skipped_busy': self.skipped_busy,
+                'encode_avg_ms': avg * 1000
+            }
+
+    def stop(self):
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.server.shutdown()
+        self.server.server_close()
+        self.executor.shutdown(wait=False)
+
+    def _handler(self):
+        streamer = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/":
+                    self._send(INDEX_HTML, "text/html; charset=utf-8")
+                elif path == "/snapshot.jpg":
+                    self._snapshot()
+                elif path == "/stream":
+                    self._stream()
+                else:
+                    self.send_error(404)
+
+            def _send(self, body, content_type):
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _snapshot(self):
+                with streamer.cond:
+                    streamer.clients += 1
+                try:
+                    jpeg, _ = streamer._wait_frame(-1, timeout=2.0)
+                finally:
+                    with streamer.cond:
+                        streamer.clients -= 1
+                if jpeg is None:
+                    self.send_error(503)
+                else:
+                    self._send(jpeg, "image/jpeg")
+
+            def _stream(self):
+                self.send_response(200)
+                self.send_header("Content-Type", f"multipart/x-mixed-replace; boundary={BOUNDARY}")
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                with streamer.cond:
+                    streamer.clients += 1
+                last_seq = -1
+                try:
+                    while streamer.running:
+                        jpeg, seq = streamer._wait_frame(last_seq)
+                        if seq <= last_seq or jpeg is None:
+                            continue
+                        last_seq = seq
+                        self.wfile.write(f"--{BOUNDARY}\r\nContent-Type: image/jpeg\r\n"
+                                         f"Content-Length: {len(jpeg)}\r\n\r\n".encode("ascii"))
+                        self.wfile.write(jpeg)
+                        self.wfile.write(b"\r\n")
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+                finally:
+                    with streamer.cond:
+                        streamer.clients -= 1
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
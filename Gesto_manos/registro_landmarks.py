@@ -0,0 +1,221 @@
+"""Registro binario de landmarks, de sólo anexado, leído con np.memmap.
+
+Formato del archivo:
+    cabecera de HEADER_SIZE bytes: MAGIC, versión, tamaño de registro y la
+        tabla de gestos propios
+    registros de tamaño fijo con dtype RECORD_DTYPE, en orden de timestamp
+
+Los ids 0..7 son los gestos de MediaPipe (eventos.GESTURE_NAMES). Las
+etiquetas de un clasificador propio (clasificador.py) reciben ids a partir
+de 8 la primera vez que aparecen y su nombre se guarda en la tabla de la
+cabecera, así el registro conserva "Rock" u "OK" y no un id genérico.
+
+Cada registro es una mano en un frame: timestamp (s), mano, id de gesto,
+score y los 21x3 landmarks en float32. La escritura se hace por bloques de
+`chunk_records` registros; la lectura mapea el archivo en memoria, así que
+filtrar por rango de tiempo no copia datos y filtrar por gesto sólo lee las
+columnas necesarias.
+"""
+import os
+import struct
+import argparse
+
+import numpy as np
+
+from eventos import GESTURE_NAMES, HAND_IDS, HAND_NAMES, UNKNOWN_GESTURE
+
+MAGIC = b"GESTLOG\0"
+VERSION = 2
+HEADER = struct.Struct("<8sII")
+# Tras HEADER: longitud (u32) y nombres de los gestos propios separados por "\n"
+LABELS = struct.Struct("<I")
+HEADER_SIZE = 4096
+LABELS_CAPACITY = HEADER_SIZE - HEADER.size - LABELS.size
+
+RECORD_DTYPE = np.dtype([
+    ('timestamp', '<f8'),
+    ('hand', 'u1'),
+    ('gesture', 'u1'),
+    ('reserved', 'u1', (2,)),
+    ('score', '<f4'),
+    ('landmarks', '<f4', (21, 3)),
+])
+
+
+class LandmarkLogWriter:
+    """Escritor por bloques de registros de landmarks"""
+    def __init__(self, path, chunk_records=1024):
+        self.path = path
+        self.buffer = np.zeros(chunk_records, dtype=RECORD_DTYPE)
+        self.count = 0
+        self.records_written = 0
+
+        exists = os.path.exists(path) and os.path.getsize(path) >= HEADER.size
+        self.file = open(path, "ab")
+        if exists:
+            labels = read_header(path)
+            # Descartar un registro parcial de una escritura interrumpida
+            size = os.path.getsize(path)
+            valid = HEADER_SIZE + (size - HEADER_SIZE) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize
+            if valid != size:
+                self.file.truncate(valid)
+        else:
+            self.file.truncate(0)
+            labels = []
+            self.file.write(self._header(labels))
+            self.file.flush()
+        self.labels = list(GESTURE_NAMES) + labels
+        self.label_ids = {name: idx for idx, name in enumerate(self.labels)}
+
+    @staticmethod
+    def _header(labels):
+        table = "\n".join(labels).encode("utf-8")
+        if len(table) > LABELS_CAPACITY:
+            raise ValueError("La tabla de gestos propios no cabe en la cabecera")
+        header = HEADER.pack(MAGIC, VERSION, RECORD_DTYPE.itemsize) + LABELS.pack(len(table)) + table
+        return header.ljust(HEADER_SIZE, b"\0")
+
+    def gesture_id(self, name):
+        """Id de un gesto; las etiquetas nuevas se añaden a la tabla de la cabecera"""
+        gesture_id = self.label_ids.get(name)
+        if gesture_id is not None:
+            return gesture_id
+        if len(self.labels) >= UNKNOWN_GESTURE:
+            raise ValueError("Demasiados gestos distintos en un mismo registro")
+        header = self._header(self.labels[len(GESTURE_NAMES):] + [name])
+        # El archivo principal está en modo anexado: la cabecera se reescribe aparte
+        with open(self.path, "r+b") as f:
+            f.write(header)
+        gesture_id = len(self.labels)
+        self.labels.append(name)
+        self.label_ids[name] = gesture_id
+        return gesture_id
+
+    def append(self, timestamp, hand, gesture, score, landmarks):
+        """Añade un registro (mano y gesto como nombre o id)"""
+        if self.count == len(self.buffer):
+            self.flush()
+        record = self.buffer[self.count]
+        record['timestamp'] = timestamp
+        record['hand'] = HAND_IDS.get(hand, HAND_IDS["Desconocida"]) if isinstance(hand, str) else hand
+        record['gesture'] = self.gesture_id(gesture) if isinstance(gesture, str) else gesture
+        record['score'] = score
+        record['landmarks'] = landmarks
+        self.count += 1
+
+    def append_frame(self, gesture_info, timestamp):
+        """Añade todas las manos de un frame (lista de gestos.build_gesture_info)"""
+        for info in gesture_info:
+            self.append(timestamp, info['hand'], info['gesture'], info['score'], info['landmarks'])
+
+    def flush(self):
+        if self.count:
+            self.file.write(self.buffer[:self.count].tobytes())
+            self.file.flush()
+            self.records_written += self.count
+            self.count = 0
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+
+def read_header(path):
+    """Valida la cabecera y devuelve la lista de gestos propios del registro"""
+    with open(path, "rb") as f:
+        data = f.read(HEADER_SIZE)
+    if len(data) < HEADER_SIZE:
+        raise ValueError(f"{path} no es un registro de landmarks")
+    magic, version, record_size = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} no es un registro de landmarks")
+    if version != VERSION or record_size != RECORD_DTYPE.itemsize:
+        raise ValueError(f"Versión de registro no soportada: {version} ({record_size} bytes)")
+    (length,) = LABELS.unpack_from(data, HEADER.size)
+    table = data[HEADER.size + LABELS.size:HEADER.size + LABELS.size + length]
+    return table.decode("utf-8").split("\n") if length else []
+
+
+class LandmarkLog:
+    """Lectura sin copia de un registro de landmarks mediante np.memmap"""
+    def __init__(self, path):
+        labels = read_header(path)
+        self.path = path
+        # Nombre de cada id de gesto: los de MediaPipe más los propios del registro
+        self.labels = list(GESTURE_NAMES) + labels
+        n = (os.path.getsize(path) - HEADER_SIZE) // RECORD_DTYPE.itemsize
+        if n:
+            self.records = np.memmap(path, dtype=RECORD_DTYPE, mode="r",
+                                     offset=HEADER_SIZE, shape=(n,))
+        else:
+            self.records = np.zeros(0, dtype=RECORD_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def time_range(self, start=None, end=None):
+        """Vista (sin copia) de los registros con start <= timestamp < end"""
+        timestamps = self.records['timestamp']
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, side="left"))
+        hi = len(timestamps) if end is None else int(np.searchsorted(timestamps, end, side="left"))
+        return self.records[lo:hi]
+
+    def by_gesture(self, gesture, start=None, end=None, hand=None):
+        """Registros de un gesto (nombre o id), opcionalmente por rango de tiempo y mano"""
+        records = self.time_range(start, end)
+        if isinstance(gesture, str):
+            if gesture not in self.labels:
+                return records[:0]
+            gesture = self.labels.index(gesture)
+        mask = records['gesture'] == gesture
+        if hand is not None:
+            if isinstance(hand, str):
+                hand = HAND_IDS.get(hand, HAND_IDS["Desconocida"])
+            mask &= records['hand'] == hand
+        return records[mask]
+
+    def gesture_counts(self, start=None, end=None):
+        """Número de registros por gesto en el rango"""
+        counts = np.bincount(self.time_range(start, end)['gesture'], minlength=256)
+        return {self.gesture_name(i): int(c) for i, c in enumerate(counts) if c}
+
+    def gesture_name(self, gesture_id):
+        return gesture_name(gesture_id, self.labels)
+
+
+def gesture_name(gesture_id, labels=GESTURE_NAMES):
+    """Nombre de un id de gesto según la tabla `labels` (por defecto, los de MediaPipe)"""
+    return labels[gesture_id] if gesture_id < len(labels) else str(gesture_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta un registro de landmarks")
+    parser.add_argument("path", help="Archivo .lmlog")
+    parser.add_argument("--gesture", default=None, help="Filtrar por gesto (p. ej. Victory)")
+    parser.add_argument("--hand", default=None, choices=HAND_NAMES, help="Filtrar por mano")
+    parser.add_argument("--start", type=float, default=None, help="Timestamp inicial (s)")
+    parser.add_argument("--end", type=float, default=None, help="Timestamp final (s)")
+    args = parser.parse_args()
+
+    log = LandmarkLog(args.path)
+    records = log.time_range(args.start, args.end)
+    print(f"Registros: {len(log)} | en el rango: {len(records)}")
+    if len(records):
+        print(f"Tiempo: {records['timestamp'][0]:.3f} - {records['timestamp'][-1]:.3f} s")
+
+    if args.gesture is None:
+        for name, count in sorted(log.gesture_counts(args.start, args.end).items(),
+                                  key=lambda item: -item[1]):
+            print(f"  {name:12s} {count}")
+        return
+
+    selected = log.by_gesture(args.gesture, args.start, args.end, args.hand)
+    print(f"Registros de {args.gesture}: {len(selected)}")
+    if len(selected):
+        print(f"  Score medio: {selected['score'].mean():.3f}")
+        wrist = selected['landmarks'][:, 0, :2].mean(axis=0)
+        print(f"  Posición media de la muñeca: x={wrist[0]:.3f} y={wrist[1]:.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Pruebas de la unión de segmentos de anotar_video.py (python3 -m pytest)."""
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+import anotar_video
+
+PROPS = {'fps': 20.0, 'width': 64, 'height': 48}
+
+
+def write_segment(path, frames, value):
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"mp4v"), PROPS['fps'],
+                             (PROPS['width'], PROPS['height']))
+    for _ in range(frames):
+        writer.write(np.full((PROPS['height'], PROPS['width'], 3), value, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def count_output_frames(path):
+    cap = cv2.VideoCapture(str(path))
+    frames = anotar_video.count_frames(cap)
+    cap.release()
+    return frames
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg no está instalado")
+def test_merge_videos_ffmpeg_sin_recodificar(tmp_path, monkeypatch):
+    parts = [write_segment(tmp_path / "part_000.mp4", 5, 40),
+             write_segment(tmp_path / "part_001.mp4", 7, 200)]
+    output = tmp_path / "salida.mp4"
+
+    # Si ffmpeg fallara se recodificaría con OpenCV: que la prueba lo detecte
+    monkeypatch.setattr(anotar_video.cv2, "VideoWriter",
+                        lambda *args: pytest.fail("se recodificó en lugar de usar ffmpeg"))
+    anotar_video.merge_videos(parts, str(output), PROPS)
+
+    assert count_output_frames(output) == 12
+
+
+def test_merge_videos_sin_ffmpeg(tmp_path, monkeypatch):
+    parts = [write_segment(tmp_path / "part_000.mp4", 5, 40),
+             write_segment(tmp_path / "part_001.mp4", 7, 200)]
+    output = tmp_path / "salida.mp4"
+
+    monkeypatch.setattr(anotar_video.shutil, "which", lambda name: None)
+    anotar_video.merge_videos(parts, str(output), PROPS)
+
+    assert count_output_frames(output) == 12
+
+
+def test_count_frames_rebobina(tmp_path):
+    path = write_segment(tmp_path / "video.mp4", 6, 100)
+    cap = cv2.VideoCapture(path)
+    assert anotar_video.count_frames(cap) == 6
+    assert cap.read()[0]
+    cap.release()
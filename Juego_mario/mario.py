@@ -3,11 +3,15 @@ import threading
 import time
 import random
 import queue
+import gc
+import math
+import argparse
+import multiprocessing
+from array import array
+from collections import deque
+from multiprocessing import shared_memory
 from dataclasses import dataclass
-from typing import List, Tuple, Optional
-
-# === INICIALIZAR PYGAME ===
-pygame.init()
+from typing import Callable, List, Tuple, Optional
 
 # === CONSTANTES ===
 SCREEN_WIDTH = 800
@@ -26,37 +30,47 @@ YELLOW = (255, 215, 0)
 RED = (255, 0, 0)
 GREEN = (0, 255, 0)
 
-# === CONFIGURACIÓN DE PANTALLA ===
-screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-pygame.display.set_caption("Mario Bros - Versión Optimizada con Threading")
-clock = pygame.time.Clock()
-
-# === IMÁGENES (CARGA Y ESCALADO) ===
-player_img_idle = pygame.image.load("Mario_quieto.png").convert_alpha()
-player_img_right = pygame.image.load("MArio_derecha.png").convert_alpha()
-player_img_left = pygame.image.load("Mario_izq.png").convert_alpha()
-player_img_jump = pygame.image.load("Mario_saltando.png").convert_alpha()
-
-enemy_img = pygame.image.load("Enemigo.png").convert_alpha()
-platform_img = pygame.image.load("Plataforma.png").convert_alpha()
-floor_img = pygame.image.load("Piso.png").convert_alpha()
-background_img = pygame.image.load("Fondo.jpeg").convert()
-coin_img = pygame.image.load("Moneda.png").convert_alpha()
-
 # Tamaños base
 PLAYER_W, PLAYER_H = 40, 60
 ENEMY_W, ENEMY_H = 40, 40
 PLATFORM_H = 20
 COIN_SIZE = 30
 
-# Escalado
-player_img_idle = pygame.transform.scale(player_img_idle, (PLAYER_W, PLAYER_H))
-player_img_right = pygame.transform.scale(player_img_right, (PLAYER_W, PLAYER_H))
-player_img_left = pygame.transform.scale(player_img_left, (PLAYER_W, PLAYER_H))
-player_img_jump = pygame.transform.scale(player_img_jump, (PLAYER_W, PLAYER_H))
-enemy_img = pygame.transform.scale(enemy_img, (ENEMY_W, ENEMY_H))
-background_img = pygame.transform.scale(background_img, (SCREEN_WIDTH, SCREEN_HEIGHT))
-coin_img = pygame.transform.scale(coin_img, (COIN_SIZE, COIN_SIZE))
+# El proceso de simulación (--backend procesos) importa este módulo sin
+# ventana: sólo el proceso principal inicializa pygame y carga imágenes.
+# Con "spawn" el nombre del proceso ya está asignado cuando se importa el módulo.
+SIMULATION_PROCESS_NAME = "Simulation"
+IS_SIMULATION_PROCESS = multiprocessing.current_process().name == SIMULATION_PROCESS_NAME
+
+if not IS_SIMULATION_PROCESS:
+    # === INICIALIZAR PYGAME ===
+    pygame.init()
+
+    # === CONFIGURACIÓN DE PANTALLA ===
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Mario Bros - Versión Optimizada con Threading")
+    clock = pygame.time.Clock()
+
+    # === IMÁGENES (CARGA Y ESCALADO) ===
+    player_img_idle = pygame.image.load("Mario_quieto.png").convert_alpha()
+    player_img_right = pygame.image.load("MArio_derecha.png").convert_alpha()
+    player_img_left = pygame.image.load("Mario_izq.png").convert_alpha()
+    player_img_jump = pygame.image.load("Mario_saltando.png").convert_alpha()
+
+    enemy_img = pygame.image.load("Enemigo.png").convert_alpha()
+    platform_img = pygame.image.load("Plataforma.png").convert_alpha()
+    floor_img = pygame.image.load("Piso.png").convert_alpha()
+    background_img = pygame.image.load("Fondo.jpeg").convert()
+    coin_img = pygame.image.load("Moneda.png").convert_alpha()
+
+    # Escalado
+    player_img_idle = pygame.transform.scale(player_img_idle, (PLAYER_W, PLAYER_H))
+    player_img_right = pygame.transform.scale(player_img_right, (PLAYER_W, PLAYER_H))
+    player_img_left = pygame.transform.scale(player_img_left, (PLAYER_W, PLAYER_H))
+    player_img_jump = pygame.transform.scale(player_img_jump, (PLAYER_W, PLAYER_H))
+    enemy_img = pygame.transform.scale(enemy_img, (ENEMY_W, ENEMY_H))
+    background_img = pygame.transform.scale(background_img, (SCREEN_WIDTH, SCREEN_HEIGHT))
+    coin_img = pygame.transform.scale(coin_img, (COIN_SIZE, COIN_SIZE))
 
 # === SINCRONIZACIÓN MEJORADA ===
 player_mutex = threading.Lock()
@@ -281,11 +295,7 @@ class Platform:
     def draw(self):
         screen_x = self.x - game_state.camera_x
         if screen_x + self.width > 0 and screen_x < SCREEN_WIDTH:
-            if self.use_floor:
-                tex = pygame.transform.scale(floor_img, (self.width, self.height))
-            else:
-                tex = pygame.transform.scale(platform_img, (self.width, self.height))
-            screen.blit(tex, (screen_x, self.y))
+            screen.blit(platform_texture(self.width, self.height, self.use_floor), (screen_x, self.y))
 
     def overlaps_with(self, other: 'Platform', margin: int = 30) -> bool:
         return not (self.x + self.width + margin < other.x or
@@ -308,7 +318,7 @@ class Coin:
             return
 
         self.float_offset += self.float_speed
-        float_y = self.y + int(5 * pygame.math.Vector2(0, 1).rotate(self.float_offset * 10).y)
+        float_y = self.y + int(5 * math.cos(math.radians(self.float_offset * 10)))
 
         screen_x = self.x - game_state.camera_x
         if -self.size < screen_x < SCREEN_WIDTH:
@@ -331,6 +341,33 @@ class Coin:
 
 
 # === FUNCIONES DE UTILIDAD ===
+# Texturas de plataforma ya escaladas, por (ancho, alto, piso)
+_platform_textures = {}
+
+
+def platform_texture(width: int, height: int, use_floor: bool):
+    key = (width, height, use_floor)
+    tex = _platform_textures.get(key)
+    if tex is None:
+        tex = pygame.transform.scale(floor_img if use_floor else platform_img, (width, height))
+        _platform_textures[key] = tex
+    return tex
+
+
+class TextCache:
+    """Reutiliza la superficie de un texto mientras no cambie su contenido"""
+    def __init__(self, font, color):
+        self.font = font
+        self.color = color
+        self.text = None
+        self.surface = None
+
+    def render(self, text: str):
+        if text != self.text:
+            self.text = text
+            self.surface = self.font.render(text, True, self.color)
+        return self.surface
+
 def update_camera():
     with game_state_mutex:
         if game_state.player_x > game_state.camera_x + CAMERA_THRESHOLD:
@@ -390,6 +427,170 @@ def generate_platform_segment(start_x: float) -> Tuple[List[Platform], List[Coin
     return platforms, coins
 
 
+# === CONTROL DEL RECOLECTOR DE BASURA ===
+class FrameGCController:
+    """
+    Ejecuta el GC cíclico de CPython sólo en el tiempo sobrante de cada frame.
+
+    - freeze(): tras cargar recursos e inicializar el mundo, mueve esos objetos
+      de larga vida a la generación permanente para que el GC no los recorra.
+    - Las colecciones automáticas se desactivan; al final de cada frame, si
+      queda margen respecto al presupuesto, se colecta la generación más joven
+      que lo necesite (la 2 sólo con mucho margen). Si la basura pendiente
+      supera `force_factor` veces el umbral, se colecta aunque no haya margen.
+    - Cada frame lento (más de `hitch_factor` x presupuesto) se anota en un
+      histograma junto con las pausas de GC que ocurrieron durante ese frame
+      (medidas con gc.callbacks, en cualquier hilo). Las colecciones por
+      generación se cuentan en ese mismo hook, así incluyen las automáticas.
+    - Con enabled=False no se toca el GC (ni se congela nada): sirve de
+      línea base para comparar.
+    """
+    HISTOGRAM_MS = (17, 20, 25, 33, 50, 100, float("inf"))
+
+    def __init__(self, fps: int, enabled: bool = True, hitch_factor: float = 1.5,
+                 min_slack_ms: float = 2.0, full_slack_ms: float = 8.0, force_factor: int = 10):
+        self.budget = 1.0 / fps
+        self.enabled = enabled
+        self.hitch_factor = hitch_factor
+        self.min_slack = min_slack_ms / 1000
+        self.full_slack = full_slack_ms / 1000
+        self.force_factor = force_factor
+        self.thresholds = gc.get_threshold()
+
+        self.frame_start = None
+        self.gc_start = {}
+        # (inicio, duración, generación) pendientes de asignar a un frame. El hook
+        # de GC anexa desde cualquier hilo; el render la vacía con popleft, ambas
+        # operaciones atómicas (un lock podría bloquearse si el GC salta dentro de él)
+        self.pauses = deque()
+
+        # Estadísticas
+        self.frames = 0
+        self.histogram = [0] * len(self.HISTOGRAM_MS)
+        self.hitches = 0
+        self.hitches_with_gc = 0
+        self.gc_in_hitches = 0.0
+        self.worst = []  # (ms del frame, ms de GC, generaciones)
+        self.collections = [0, 0, 0]
+        self.forced = 0
+        self.gc_time = 0.0
+        self.frozen = 0
+
+        gc.callbacks.append(self._on_gc)
+        if enabled:
+            gc.disable()
+
+    def _on_gc(self, phase, info):
+        now = time.perf_counter()
+        thread_id = threading.get_ident()
+        if phase == "start":
+            self.gc_start[thread_id] = now
+        else:
+            start = self.gc_start.pop(thread_id, now)
+            self.pauses.append((start, now - start, info["generation"]))
+
+    def freeze(self):
+        """Congela los objetos vivos tras la carga de recursos y el mundo inicial"""
+        if not self.enabled:
+            return
+        gc.collect()
+        gc.freeze()
+        self.frozen = gc.get_freeze_count()
+
+    def begin_frame(self):
+        """Marca el inicio de un frame y cierra las estadísticas del anterior"""
+        now = time.perf_counter()
+        if self.frame_start is not None:
+            self._record_frame(self.frame_start, now)
+        self.frame_start = now
+
+    def _record_frame(self, start, end):
+        frame_time = end - start
+        pauses = []
+        while True:
+            try:
+                pauses.append(self.pauses.popleft())
+            except IndexError:
+                break
+        for pause in pauses:
+            self.collections[pause[2]] += 1
+        in_frame = [p for p in pauses if p[0] >= start]
+        gc_time = sum(p[1] for p in in_frame)
+        self.gc_time += sum(p[1] for p in pauses)
+
+        self.frames += 1
+        frame_ms = frame_time * 1000
+        for i, limit in enumerate(self.HISTOGRAM_MS):
+            if frame_ms <= limit:
+                self.histogram[i] += 1
+                break
+
+        if frame_time > self.budget * self.hitch_factor:
+            self.hitches += 1
+            if in_frame:
+                self.hitches_with_gc += 1
+                self.gc_in_hitches += gc_time
+            self.worst.append((frame_ms, gc_time * 1000, sorted({p[2] for p in in_frame})))
+            self.worst.sort(key=lambda h: -h[0])
+            del self.worst[5:]
+
+    def idle(self):
+        """Llamar al terminar el trabajo del frame (antes de esperar al siguiente)"""
+        if not self.enabled:
+            return
+        slack = self.budget - (time.perf_counter() - self.frame_start)
+        counts = gc.get_count()
+
+        # Generación a colectar: la más vieja cuyo contador superó su umbral
+        generation = None
+        for gen in (2, 1, 0):
+            if self.thresholds[gen] and counts[gen] >= self.thresholds[gen]:
+                generation = gen
+                break
+        if generation is None:
+            return
+
+        if counts[0] >= self.thresholds[0] * self.force_factor:
+            # Demasiada basura pendiente: colectar aunque no haya margen
+            generation = min(generation, 1)
+            self.forced += 1
+        elif slack < self.min_slack:
+            return
+        elif generation == 2 and slack < self.full_slack:
+            generation = 1
+
+        gc.collect(generation)
+
+    def close(self):
+        if self.frame_start is not None:
+            self._record_frame(self.frame_start, time.perf_counter())
+            self.frame_start = None
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        gc.enable()
+
+    def report(self) -> str:
+        lines = [f"   Frames: {self.frames} | presupuesto: {self.budget * 1000:.1f} ms"]
+        previous = 0
+        for limit, count in zip(self.HISTOGRAM_MS, self.histogram):
+            label = f"> {previous} ms" if limit == float("inf") else f"{previous}-{limit} ms"
+            pct = count / self.frames if self.frames else 0.0
+            lines.append(f"     {label:>10s}: {count:6d} ({pct:.1%})")
+            previous = limit
+        lines.append(f"   Frames lentos (> {self.budget * self.hitch_factor * 1000:.1f} ms): "
+                     f"{self.hitches} | con pausa de GC: {self.hitches_with_gc} "
+                     f"({self.gc_in_hitches * 1000:.1f} ms de GC)")
+        for frame_ms, gc_ms, generations in self.worst:
+            tag = f"GC gen {generations} {gc_ms:.1f} ms" if generations else "sin GC"
+            lines.append(f"     {frame_ms:6.1f} ms  [{tag}]")
+        mode = "en tiempo sobrante" if self.enabled else "automático"
+        lines.append(f"   GC {mode}: colecciones gen0/1/2 = {self.collections[0]}/"
+                     f"{self.collections[1]}/{self.collections[2]} "
+                     f"(forzadas: {self.forced}) | tiempo total: {self.gc_time * 1000:.1f} ms | "
+                     f"objetos congelados: {self.frozen}")
+        return "\n".join(lines)
+
+
 # === HILOS DEL JUEGO ===
 def platform_generation_thread():
     print("🏗️  [THREAD] Platform Generator iniciado")
@@ -586,47 +787,366 @@ def initialize_game():
     print("="*60 + "\n")
 
 
+def apply_player_input(player: Player, left: bool, right: bool):
+    """Movimiento lateral del jugador según las teclas presionadas"""
+    move_speed = 5
+    
+    with game_state_mutex:
+        if left:
+            game_state.player_x -= move_speed
+            player.direction = "left"
+        elif right:
+            game_state.player_x += move_speed
+            player.direction = "right"
+        else:
+            player.direction = "idle"
+
+
+def simulation_step(player: Player):
+    """Física del jugador, cámara y fin de partida (un tick de simulación)"""
+    update_camera()
+    player.update()
+
+    with game_state_mutex:
+        if game_state.player_lives <= 0:
+            game_state.game_running = False
+
+
+# === BACKEND MULTIPROCESO (MEMORIA COMPARTIDA) ===
+MAX_PLATFORMS = 128
+MAX_COINS = 256
+MAX_ENEMIES = 16
+
+# Campos del bloque de estado (float64)
+(S_PLAYER_X, S_PLAYER_Y, S_PLAYER_VY, S_COINS, S_SCORE, S_LIVES, S_CAMERA_X,
+ S_INVULNERABLE, S_RUNNING, S_JUMPING, S_SIM_CPU, S_SIM_WALL, S_SIM_BUSY, S_SIM_TICKS,
+ S_N_PLATFORMS, S_N_COINS, S_N_ENEMIES) = range(17)
+STATE_HEADER = 17
+PLATFORM_FIELDS = 4  # x, y, ancho, es_piso
+COIN_FIELDS = 4      # x, y, activa, fase de flotación
+ENEMY_FIELDS = 3     # x, y, activo
+PLATFORMS_AT = STATE_HEADER
+COINS_AT = PLATFORMS_AT + MAX_PLATFORMS * PLATFORM_FIELDS
+ENEMIES_AT = COINS_AT + MAX_COINS * COIN_FIELDS
+STATE_SIZE = ENEMIES_AT + MAX_ENEMIES * ENEMY_FIELDS
+
+# Campos del bloque de entradas (float64), escritos sólo por el render
+I_LEFT, I_RIGHT, I_JUMPS, I_QUIT = range(4)
+INPUT_SIZE = 4
+# Tiempo máximo que el render espera un estado estable antes de darse por vencido
+READ_TIMEOUT = 0.5
+
+
+class SharedWorld:
+    """
+    Estado del mundo en multiprocessing.shared_memory.
+
+    Diseño del bloque: [secuencia uint64][estado float64 x STATE_SIZE][entradas float64 x INPUT_SIZE]
+
+    El estado se protege con un seqlock: la simulación incrementa la
+    secuencia (impar = escribiendo), copia el estado completo de una vez y
+    la vuelve a incrementar (par = estable). El render copia el bloque y
+    reintenta si la secuencia era impar o cambió durante la copia, así nunca
+    ve un frame a medio escribir y ninguno de los dos procesos se bloquea.
+    Las entradas son valores sueltos de 8 bytes escritos por un único
+    proceso, así que no necesitan protocolo.
+    """
+    def __init__(self, name: Optional[str] = None):
+        size = 8 + (STATE_SIZE + INPUT_SIZE) * 8
+        self.owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self.owner, size=size)
+        self.name = self.shm.name
+        self.seq = self.shm.buf[:8].cast("Q")
+        self.state = self.shm.buf[8:8 + STATE_SIZE * 8].cast("d")
+        self.inputs = self.shm.buf[8 + STATE_SIZE * 8:size].cast("d")
+        self.buffer = [0.0] * STATE_SIZE  # estado local que se publica de una vez
+        self.retries = 0
+        if self.owner:
+            self.seq[0] = 0
+            self.state[S_RUNNING] = 1.0
+
+    # --- Lado de la simulación ---
+    def publish(self, player: Player, stats: Tuple[float, float, float, int]):
+        buf = self.buffer
+        with game_state_mutex:
+            buf[S_PLAYER_X] = game_state.player_x
+            buf[S_PLAYER_Y] = game_state.player_y
+            buf[S_PLAYER_VY] = game_state.player_velocity_y
+            buf[S_COINS] = game_state.player_coins
+            buf[S_SCORE] = game_state.player_score
+            buf[S_LIVES] = game_state.player_lives
+            buf[S_CAMERA_X] = game_state.camera_x
+            buf[S_INVULNERABLE] = game_state.invulnerable_until
+            buf[S_RUNNING] = 1.0 if game_state.game_running else 0.0
+        buf[S_JUMPING] = 1.0 if player.jumping else 0.0
+        buf[S_SIM_CPU], buf[S_SIM_WALL], buf[S_SIM_BUSY], buf[S_SIM_TICKS] = stats
+
+        with platform_mutex:
+            platforms = shared_platforms[:MAX_PLATFORMS]
+        for i, platform in enumerate(platforms):
+            base = PLATFORMS_AT + i * PLATFORM_FIELDS
+            buf[base:base + PLATFORM_FIELDS] = (platform.x, platform.y, platform.width,
+                                                1.0 if platform.use_floor else 0.0)
+        buf[S_N_PLATFORMS] = len(platforms)
+
+        with coin_mutex:
+            coins = [c for c in shared_coins if c.active][:MAX_COINS]
+        for i, coin in enumerate(coins):
+            base = COINS_AT + i * COIN_FIELDS
+            buf[base:base + COIN_FIELDS] = (coin.x, coin.y, 1.0, coin.float_offset)
+        buf[S_N_COINS] = len(coins)
+
+        with enemy_mutex:
+            enemies = [e for e in shared_enemies if e.active][:MAX_ENEMIES]
+        for i, enemy in enumerate(enemies):
+            base = ENEMIES_AT + i * ENEMY_FIELDS
+            buf[base:base + ENEMY_FIELDS] = (enemy.x, enemy.y, 1.0)
+        buf[S_N_ENEMIES] = len(enemies)
+
+        self.seq[0] += 1
+        self.state[:] = array("d", buf)
+        self.seq[0] += 1
+
+    def get_input(self) -> Tuple[bool, bool, int, bool]:
+        inputs = self.inputs
+        return inputs[I_LEFT] > 0, inputs[I_RIGHT] > 0, int(inputs[I_JUMPS]), inputs[I_QUIT] > 0
+
+    # --- Lado del render ---
+    def read(self, alive: Optional[Callable[[], bool]] = None,
+             timeout: float = READ_TIMEOUT) -> Optional[memoryview]:
+        """
+        Copia consistente del estado (seqlock del lado lector). Devuelve None
+        si `alive()` indica que la simulación murió o si no hay un estado
+        estable en `timeout` segundos (p. ej. murió con la secuencia impar).
+        """
+        deadline = time.perf_counter() + timeout
+        while True:
+            before = self.seq[0]
+            if before % 2 == 0:
+                snapshot = bytes(self.state.cast("B"))
+                if self.seq[0] == before:
+                    return memoryview(snapshot).cast("d")
+            self.retries += 1
+            if (alive is not None and not alive()) or time.perf_counter() > deadline:
+                return None
+            time.sleep(0)
+
+    def set_input(self, left: bool, right: bool):
+        self.inputs[I_LEFT] = 1.0 if left else 0.0
+        self.inputs[I_RIGHT] = 1.0 if right else 0.0
+
+    def request_jump(self):
+        self.inputs[I_JUMPS] += 1
+
+    def request_quit(self):
+        self.inputs[I_QUIT] = 1.0
+
+    def close(self):
+        # Liberar las vistas antes de cerrar el bloque
+        self.seq.release()
+        self.state.release()
+        self.inputs.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def simulation_process(shm_name: str):
+    """
+    Proceso de simulación: física, generación del mundo, enemigos, monedas y
+    eventos (los mismos hilos del juego) en su propio intérprete. Publica el
+    estado en memoria compartida en cada tick.
+    """
+    world = SharedWorld(shm_name)
+    player = Player()
+    initialize_game()
+
+    period = 1.0 / FPS
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    next_tick = wall_start
+    busy = 0.0
+    ticks = 0
+    jumps_seen = 0
+
+    try:
+        while game_state.game_running:
+            tick_start = time.perf_counter()
+            left, right, jumps, quit_requested = world.get_input()
+            if quit_requested:
+                game_state.game_running = False
+                break
+            if jumps > jumps_seen:
+                jumps_seen = jumps
+                player.jump()
+            apply_player_input(player, left, right)
+            simulation_step(player)
+
+            now = time.perf_counter()
+            busy += now - tick_start
+            ticks += 1
+            world.publish(player, (time.process_time() - cpu_start, now - wall_start, busy, ticks))
+
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_tick = time.perf_counter()  # atrasado: no acumular ticks
+    finally:
+        game_state.game_running = False
+        now = time.perf_counter()
+        world.publish(player, (time.process_time() - cpu_start, now - wall_start, busy, ticks))
+        world.close()
+
+
+# Objetos reutilizados por el render para dibujar el estado compartido
+_platform_pool: List[Platform] = []
+_coin_pool: List[Coin] = []
+_enemy_pool: List[Enemy] = []
+
+
+def apply_snapshot(snapshot: memoryview, player: Player, render_frame: int):
+    """Copia el estado publicado por la simulación al estado local del render"""
+    with game_state_mutex:
+        game_state.player_x = snapshot[S_PLAYER_X]
+        game_state.player_y = snapshot[S_PLAYER_Y]
+        game_state.player_velocity_y = snapshot[S_PLAYER_VY]
+        game_state.player_coins = int(snapshot[S_COINS])
+        game_state.player_score = int(snapshot[S_SCORE])
+        game_state.player_lives = int(snapshot[S_LIVES])
+        game_state.camera_x = snapshot[S_CAMERA_X]
+        game_state.invulnerable_until = snapshot[S_INVULNERABLE]
+        game_state.game_running = snapshot[S_RUNNING] > 0
+    player.jumping = snapshot[S_JUMPING] > 0
+
+    n = int(snapshot[S_N_PLATFORMS])
+    while len(_platform_pool) < n:
+        _platform_pool.append(Platform(0, 0, 1))
+    for i in range(n):
+        base = PLATFORMS_AT + i * PLATFORM_FIELDS
+        platform = _platform_pool[i]
+        platform.x = snapshot[base]
+        platform.y = snapshot[base + 1]
+        platform.width = int(snapshot[base + 2])
+        platform.use_floor = snapshot[base + 3] > 0
+    with platform_mutex:
+        shared_platforms[:] = _platform_pool[:n]
+
+    n = int(snapshot[S_N_COINS])
+    while len(_coin_pool) < n:
+        _coin_pool.append(Coin(0, 0))
+    for i in range(n):
+        base = COINS_AT + i * COIN_FIELDS
+        coin = _coin_pool[i]
+        coin.x = snapshot[base]
+        coin.y = snapshot[base + 1]
+        coin.active = snapshot[base + 2] > 0
+        coin.float_offset = snapshot[base + 3] + render_frame * coin.float_speed
+    with coin_mutex:
+        shared_coins[:] = _coin_pool[:n]
+
+    n = int(snapshot[S_N_ENEMIES])
+    while len(_enemy_pool) < n:
+        _enemy_pool.append(Enemy(0, 0, (0, 0, 0)))
+    for i in range(n):
+        base = ENEMIES_AT + i * ENEMY_FIELDS
+        enemy = _enemy_pool[i]
+        enemy.x = snapshot[base]
+        enemy.y = snapshot[base + 1]
+        enemy.active = snapshot[base + 2] > 0
+    with enemy_mutex:
+        shared_enemies[:] = _enemy_pool[:n]
+
+
 # === BUCLE PRINCIPAL ===
+def parse_args():
+    parser = argparse.ArgumentParser(description="Mario Bros con threading")
+    parser.add_argument("--no-gc-control", action="store_true",
+                        help="Dejar el GC automático de CPython (sin control por frame)")
+    parser.add_argument("--hitch-factor", type=float, default=1.5,
+                        help="Un frame es lento si dura más que este factor x el presupuesto")
+    parser.add_argument("--backend", choices=["hilos", "procesos"], default="hilos",
+                        help="hilos: todo en un proceso; procesos: simulación en otro "
+                             "proceso con el estado en memoria compartida")
+    return parser.parse_args()
+
+
 def main():
+    args = parse_args()
+    gc_controller = FrameGCController(FPS, enabled=not args.no_gc_control,
+                                      hitch_factor=args.hitch_factor)
+
     player = Player()
-    initialize_game()
+    world = None
+    sim_process = None
+    if args.backend == "procesos":
+        world = SharedWorld()
+        context = multiprocessing.get_context("spawn")
+        sim_process = context.Process(target=simulation_process, args=(world.name,),
+                                      name=SIMULATION_PROCESS_NAME, daemon=True)
+        sim_process.start()
+        print(f"✅ Proceso de simulación iniciado (PID {sim_process.pid})")
+    else:
+        initialize_game()
 
     font = pygame.font.SysFont('Arial', 22)
     font_big = pygame.font.SysFont('Arial', 32, bold=True)
+    lives_cache = TextCache(font, RED)
+    score_cache = TextCache(font, WHITE)
+    coins_cache = TextCache(font_big, YELLOW)
+    invuln_text = font.render("⚡ INVULNERABLE", True, GREEN)
+
+    # Recursos y mundo inicial ya creados: el GC no necesita volver a recorrerlos
+    gc_controller.freeze()
 
     print("\n🎮 Controles:")
     print("   ← → : Mover")
     print("   ESPACIO: Saltar")
     print("   ESC: Salir\n")
 
+    render_frames = 0
+    render_busy = 0.0
+    render_cpu_start = time.process_time()
+    render_start = time.perf_counter()
+
     while game_state.game_running:
+        gc_controller.begin_frame()
+        frame_start = time.perf_counter()
+        quit_requested = False
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
-                game_state.game_running = False
+                quit_requested = True
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_SPACE:
-                    player.jump()
+                    if world is not None:
+                        world.request_jump()
+                    else:
+                        player.jump()
                 elif event.key == pygame.K_ESCAPE:
-                    game_state.game_running = False
+                    quit_requested = True
 
         keys = pygame.key.get_pressed()
-        move_speed = 5
-        
-        with game_state_mutex:
-            if keys[pygame.K_LEFT]:
-                game_state.player_x -= move_speed
-                player.direction = "left"
-            elif keys[pygame.K_RIGHT]:
-                game_state.player_x += move_speed
-                player.direction = "right"
-            else:
-                player.direction = "idle"
 
-        update_camera()
-        player.update()
-
-        with game_state_mutex:
-            if game_state.player_lives <= 0:
+        if world is None:
+            if quit_requested:
+                game_state.game_running = False
+            apply_player_input(player, keys[pygame.K_LEFT], keys[pygame.K_RIGHT])
+            simulation_step(player)
+        else:
+            # La simulación corre en otro proceso: enviar teclas y leer su estado
+            if quit_requested:
+                world.request_quit()
+            world.set_input(keys[pygame.K_LEFT], keys[pygame.K_RIGHT])
+            player.direction = ("left" if keys[pygame.K_LEFT] else
+                                "right" if keys[pygame.K_RIGHT] else "idle")
+            snapshot = world.read(sim_process.is_alive)
+            if snapshot is None:
+                print("⚠️ La simulación no publica un estado estable; se termina el juego")
+                game_state.game_running = False
+            else:
+                apply_snapshot(snapshot, player, render_frames)
+            if quit_requested or not sim_process.is_alive():
                 game_state.game_running = False
 
         screen.blit(background_img, (0, 0))
@@ -648,12 +1168,11 @@ def main():
         player.draw()
 
         with game_state_mutex:
-            lives_text = font.render(f"❤️ x{game_state.player_lives}", True, RED)
-            score_text = font.render(f"Puntos: {game_state.player_score}", True, WHITE)
-            coins_text = font_big.render(f"🪙 {game_state.player_coins}", True, YELLOW)
+            lives_text = lives_cache.render(f"❤️ x{game_state.player_lives}")
+            score_text = score_cache.render(f"Puntos: {game_state.player_score}")
+            coins_text = coins_cache.render(f"🪙 {game_state.player_coins}")
             
             if time.time() < game_state.invulnerable_until:
-                invuln_text = font.render("⚡ INVULNERABLE", True, GREEN)
                 screen.blit(invuln_text, (SCREEN_WIDTH//2 - 80, 10))
 
         screen.blit(lives_text, (10, 10))
@@ -661,8 +1180,26 @@ def main():
         screen.blit(coins_text, (SCREEN_WIDTH - 120, 10))
 
         pygame.display.flip()
+        render_busy += time.perf_counter() - frame_start
+        render_frames += 1
+        gc_controller.idle()
         clock.tick(FPS)
 
+    gc_controller.close()
+    render_wall = time.perf_counter() - render_start
+    render_cpu = time.process_time() - render_cpu_start
+
+    sim_stats = None
+    if world is not None:
+        world.request_quit()
+        sim_process.join(timeout=2.0)
+        snapshot = world.read()
+        if snapshot is not None:
+            apply_snapshot(snapshot, player, render_frames)
+            sim_stats = (snapshot[S_SIM_CPU], snapshot[S_SIM_WALL], snapshot[S_SIM_BUSY],
+                         int(snapshot[S_SIM_TICKS]))
+        world.close()
+
     screen.fill(BLACK)
     
     with game_state_mutex:
@@ -684,6 +1221,18 @@ def main():
     print("="*60)
     print(f"   Puntuación final: {final_score}")
     print(f"   Monedas recolectadas: {final_coins}")
+    print("-"*60)
+    print(f"   Backend: {args.backend}")
+    if render_wall > 0:
+        print(f"   Render: {render_frames} frames | ocupado {render_busy / render_wall:.1%} del tiempo | "
+              f"CPU del proceso {render_cpu / render_wall:.1%}")
+    if sim_stats is not None and sim_stats[1] > 0:
+        sim_cpu, sim_wall, sim_busy, sim_ticks = sim_stats
+        print(f"   Simulación: {sim_ticks} ticks | bucle ocupado {sim_busy / sim_wall:.1%} | "
+              f"CPU del proceso (con sus hilos) {sim_cpu / sim_wall:.1%} | "
+              f"reintentos del seqlock: {world.retries}")
+    print("   Tiempos de frame y pausas de GC:")
+    print(gc_controller.report())
     print("="*60 + "\n")
     
     time.sleep(4)
@@ -0,0 +1,88 @@
+import os
+
+import streamlit as st
+
+from sentiment_parallel import iter_chunks
+from resultados import ResultStore, export_csv
+from benchmark_sentimiento import load_recommendation
+
+st.set_page_config(page_title="Sentiment Parallel", layout="wide")
+
+st.title("Procesar comentarios en paralelo - Sentiment Analysis")
+
+uploaded = st.file_uploader("Sube un CSV o Parquet (columna 'comentario')", type=["csv", "parquet"])
+# Valores por defecto: recomendación de benchmark_sentimiento.py si existe
+cpus = os.cpu_count() or 1
+default_workers, default_chunk = load_recommendation(
+    os.environ.get("SENTIMENT_BENCHMARK", "benchmark_sentimiento.json")) or (cpus, 20000)
+max_workers = st.sidebar.slider("Número de procesos", 1, cpus, min(default_workers, cpus))
+chunk_size = st.sidebar.number_input(
+    "Tamaño de chunk (filas por tarea)", min_value=1000, max_value=200000,
+    value=min(max(default_chunk, 1000), 200000), step=1000
+)
+
+store = ResultStore()
+
+if uploaded:
+    if st.button("Procesar comentarios"):
+        st.warning("Procesando comentarios en paralelo...")
+
+        # El archivo se lee por chunks y el resultado se escribe a disco (Parquet)
+        # a medida que los procesos terminan. Si el archivo ya se procesó, o es
+        # uno anterior con filas nuevas al final, sólo se puntúa lo nuevo.
+        status = st.empty()
+
+        def show_progress(rows):
+            status.text(f"Filas procesadas: {rows}")
+
+        try:
+            result, stats = store.score(uploaded, "comentario", int(chunk_size), max_workers,
+                                        progress=show_progress)
+        except ValueError as e:
+            st.error(str(e))
+            st.stop()
+        except Exception as e:
+            st.error(f"Error leyendo el archivo: {e}")
+            st.stop()
+
+        if stats['stored']:
+            st.success(f"Archivo ya procesado: {stats['rows']} filas reutilizadas 🎉")
+        else:
+            st.success(
+                f"Procesamiento completado! 🎉 {stats['rows_scored']} filas puntuadas "
+                f"({stats['rows_reused']} reutilizadas) en {stats['seconds']:.1f} s "
+                f"({stats['rows_per_second']:.0f} filas/s con {stats['workers']} procesos)"
+            )
+            st.info(
+                f"Textos distintos: {stats['unique_texts']} "
+                f"({stats['duplicates_collapsed']} duplicados agrupados) | "
+                f"aciertos de caché: {stats['cache_hit_rate']:.1%}"
+            )
+        st.session_state["result"] = result
+
+if "result" in st.session_state and os.path.exists(st.session_state["result"]):
+    result = st.session_state["result"]
+    preview = next(iter_chunks(result, "parquet", 5), None)
+    if preview is None:
+        st.info("El resultado está vacío: el archivo no tiene filas de datos.")
+    else:
+        st.dataframe(preview.head())
+
+    # Las descargas se sirven desde archivos en disco: ni el DataFrame completo
+    # ni un string CSV con todo el resultado se construyen en memoria
+    download_format = st.radio("Formato de descarga", ["Parquet", "CSV"], horizontal=True)
+    if download_format == "Parquet":
+        path, name, mime = result, "sentimientos.parquet", "application/octet-stream"
+    else:
+        path = result[:-len(".parquet")] + ".csv"
+        if not os.path.exists(path):
+            export_csv(result, path)
+        name, mime = "sentimientos.csv", "text/csv"
+
+    with open(path, "rb") as f:
+        st.download_button(
+            "Descargar resultados",
+            f,
+            name,
+            mime,
+        )
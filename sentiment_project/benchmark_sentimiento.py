@@ -0,0 +1,347 @@
+"""Benchmark y escalado del análisis de sentimiento.
+
+Genera un corpus sintético de comentarios (número de filas, distribución de
+longitud y tasa de duplicados configurables) y un léxico sintético del
+tamaño pedido, y mide:
+
+  - la puntuación en un solo proceso: el algoritmo anterior (una búsqueda
+    de subcadena por término del léxico) frente al LexiconMatcher actual;
+  - el pipeline completo (score_file) para cada combinación de número de
+    procesos y tamaño de chunk: filas/s, latencia de cada chunk desde que
+    se envía al pool hasta que se escribe (p50/p95) y memoria pico del
+    proceso principal más la de sus procesos hijos.
+
+El resultado se guarda en JSON junto con la configuración recomendada para
+este host; con --baseline se compara contra un JSON anterior. La app usa la
+recomendación como valores por defecto de la barra lateral (ver app.py).
+
+Uso:
+    python3 benchmark_sentimiento.py --rows 200000 --lexicon-size 20000 -o bench.json
+    python3 benchmark_sentimiento.py --workers 1 2 4 8 --chunk-sizes 5000 20000 50000
+    python3 benchmark_sentimiento.py --baseline bench_anterior.json -o bench.json
+"""
+import os
+import json
+import time
+import random
+import argparse
+import platform
+import resource
+import tempfile
+
+import numpy as np
+
+from sentiment_parallel import LEXICON, LexiconMatcher, ScoreCache, score_file, score_text_lexicon
+
+FILLER_WORDS = ("el", "la", "de", "que", "y", "en", "un", "una", "muy", "pero", "producto",
+                "servicio", "entrega", "precio", "calidad", "tienda", "nada", "todo", "algo")
+EMOJI_REPLIES = ("👍", "😀😀", "🔥", "👎", "😡", "❤️")
+# Dentro de este margen (fracción del mejor) se prefiere menos procesos y chunks más chicos
+RECOMMEND_TOLERANCE = 0.05
+
+
+def synthetic_lexicon(size, seed=0):
+    """Léxico base más términos sintéticos (10% de ellos de dos palabras)"""
+    rng = random.Random(seed)
+    lexicon = dict(LEXICON)
+    i = 0
+    while len(lexicon) < size:
+        term = f"term{i}"
+        if rng.random() < 0.1:
+            term = f"{term} x{i}"
+        lexicon[term] = rng.choice((-2, -1, 1, 2))
+        i += 1
+    return lexicon
+
+
+def synthetic_corpus(rows, lexicon, mean_words=20, length_sigma=0.8, duplicate_rate=0.3,
+                     hit_rate=0.15, seed=0):
+    """
+    Comentarios con longitud lognormal (media `mean_words` palabras).
+
+    Una fracción `duplicate_rate` de las filas repite un comentario anterior
+    (o es una respuesta de sólo emojis); en el resto cada palabra es un
+    término del léxico con probabilidad `hit_rate`.
+    """
+    rng = random.Random(seed)
+    np_rng = np.random.default_rng(seed)
+    terms = list(lexicon)
+    mu = np.log(mean_words) - length_sigma ** 2 / 2
+    lengths = np.maximum(1, np_rng.lognormal(mu, length_sigma, rows).astype(int))
+
+    texts = []
+    for n in lengths:
+        if texts and rng.random() < duplicate_rate:
+            texts.append(rng.choice(EMOJI_REPLIES) if rng.random() < 0.2 else rng.choice(texts))
+            continue
+        words = [rng.choice(terms) if rng.random() < hit_rate else rng.choice(FILLER_WORDS)
+                 for _ in range(n)]
+        texts.append(" ".join(words).capitalize() + rng.choice((".", "!", "", "?")))
+    return texts
+
+
+def score_text_substring(text, lexicon):
+    """Algoritmo anterior: una búsqueda de subcadena por cada término del léxico"""
+    t = text.lower()
+    score = 0
+    for word, value in lexicon.items():
+        if word in t:
+            score += value
+    return score
+
+
+def bench_single_process(texts, lexicon, max_seconds=10.0):
+    """Filas/s en un proceso: búsqueda por subcadena frente al matcher compilado"""
+    matcher = LexiconMatcher(lexicon)
+
+    started = time.perf_counter()
+    for text in texts:
+        score_text_lexicon(text, matcher)
+    matcher_rate = len(texts) / (time.perf_counter() - started)
+
+    # El algoritmo anterior puede ser muy lento con léxicos grandes: limitar el tiempo
+    done = 0
+    started = time.perf_counter()
+    for text in texts:
+        score_text_substring(text, lexicon)
+        done += 1
+        if done % 100 == 0 and time.perf_counter() - started > max_seconds:
+            break
+    substring_rate = done / (time.perf_counter() - started)
+
+    return {
+        'matcher_rows_per_second': matcher_rate,
+        'substring_rows_per_second': substring_rate,
+        'substring_rows_measured': done,
+        'speedup': matcher_rate / substring_rate if substring_rate else None
+    }
+
+
+def rss_mb(pid="self"):
+    """RSS actual de un proceso (Linux)"""
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+
+
+def child_pids():
+    """PIDs de los procesos hijos de este proceso (Linux)"""
+    pids = []
+    for task in os.listdir("/proc/self/task"):
+        with open(f"/proc/self/task/{task}/children") as f:
+            pids.extend(f.read().split())
+    return pids
+
+
+def current_rss_mb():
+    """
+    RSS actual del proceso más el de sus hijos (los procesos del pool).
+    Sin /proc, la suma de los picos de getrusage propio y de los hijos ya
+    terminados.
+    """
+    try:
+        total = rss_mb()
+    except (OSError, ValueError):
+        return (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+                + resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / 1024
+    try:
+        pids = child_pids()
+    except OSError:
+        pids = []
+    for pid in pids:
+        try:
+            total += rss_mb(pid)
+        except (OSError, ValueError):
+            pass  # El hijo terminó entre el listado y la lectura
+    return total
+
+
+def bench_pipeline(corpus_path, output_path, lexicon, workers, chunk_size, use_cache):
+    """Ejecuta score_file una vez y mide filas/s, latencia por chunk y memoria"""
+    latencies = []
+    peak_rss = [current_rss_mb()]
+
+    def on_chunk(rows, seconds):
+        latencies.append(seconds * 1000)
+        peak_rss[0] = max(peak_rss[0], current_rss_mb())
+
+    # Caché nueva en cada corrida para no arrastrar aciertos de la anterior
+    cache = ScoreCache() if use_cache else None
+    stats = score_file(corpus_path, output_path, "comentario", chunk_size, workers, lexicon,
+                       cache=cache, on_chunk=on_chunk)
+    latencies = latencies or [0.0]
+    return {
+        'workers': workers,
+        'chunk_size': chunk_size,
+        'rows': stats['rows'],
+        'chunks': stats['chunks'],
+        'seconds': stats['seconds'],
+        'rows_per_second': stats['rows_per_second'],
+        'chunk_p50_ms': float(np.percentile(latencies, 50)),
+        'chunk_p95_ms': float(np.percentile(latencies, 95)),
+        'peak_rss_mb': peak_rss[0],
+        'duplicates_collapsed': stats['duplicates_collapsed'],
+        'cache_hit_rate': stats['cache_hit_rate']
+    }
+
+
+def recommend(results, tolerance=RECOMMEND_TOLERANCE):
+    """Configuración recomendada: la más rápida, o dentro de `tolerance` la más barata"""
+    best = max(r['rows_per_second'] for r in results)
+    good = [r for r in results if r['rows_per_second'] >= best * (1 - tolerance)]
+    return min(good, key=lambda r: (r['workers'], r['chunk_size']))
+
+
+def load_recommendation(path):
+    """(procesos, tamaño de chunk) recomendados en un JSON de este benchmark, o None"""
+    try:
+        with open(path, encoding="utf-8") as f:
+            rec = json.load(f)['recommendation']
+        return int(rec['workers']), int(rec['chunk_size'])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def config_differences(config, baseline):
+    """Parámetros del corpus/léxico que difieren de los de un benchmark anterior"""
+    old = baseline.get('config', {})
+    return {key: (old.get(key), value) for key, value in config.items() if old.get(key) != value}
+
+
+def compare_baseline(results, baseline, config):
+    """
+    Cociente de filas/s contra un benchmark anterior, por (procesos, chunk).
+    Sólo tiene sentido con el mismo corpus y léxico: si la configuración
+    difiere se lanza ValueError en lugar de comparar.
+    """
+    differences = config_differences(config, baseline)
+    if differences:
+        detail = ", ".join(f"{key}: {old} -> {new}" for key, (old, new) in differences.items())
+        raise ValueError(f"La configuración no coincide con la línea base ({detail})")
+    previous = {(r['workers'], r['chunk_size']): r for r in baseline.get('results', [])}
+    comparison = []
+    for r in results:
+        old = previous.get((r['workers'], r['chunk_size']))
+        if old and old['rows_per_second']:
+            comparison.append({'workers': r['workers'], 'chunk_size': r['chunk_size'],
+                               'rows_per_second': r['rows_per_second'],
+                               'baseline_rows_per_second': old['rows_per_second'],
+                               'ratio': r['rows_per_second'] / old['rows_per_second']})
+    return comparison
+
+
+def parse_args():
+    cpus = os.cpu_count() or 1
+    default_workers = sorted({w for w in (1, 2, 4, cpus) if w <= cpus})
+    parser = argparse.ArgumentParser(description="Benchmark del análisis de sentimiento")
+    parser.add_argument("--rows", type=int, default=100000, help="Filas del corpus sintético")
+    parser.add_argument("--mean-words", type=float, default=20, help="Palabras promedio por comentario")
+    parser.add_argument("--length-sigma", type=float, default=0.8,
+                        help="Sigma de la distribución lognormal de longitudes")
+    parser.add_argument("--duplicate-rate", type=float, default=0.3,
+                        help="Fracción de filas que repiten un comentario anterior")
+    parser.add_argument("--lexicon-size", type=int, default=10000, help="Términos del léxico sintético")
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers,
+                        help="Números de procesos a probar")
+    parser.add_argument("--chunk-sizes", type=int, nargs="+", default=[2000, 10000, 50000],
+                        help="Tamaños de chunk a probar")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Desactivar la caché entre chunks (los duplicados dentro "
+                             "de un mismo chunk se siguen agrupando)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=None, help="JSON de un benchmark anterior")
+    parser.add_argument("-o", "--output", default="benchmark_sentimiento.json",
+                        help="Archivo JSON de resultados")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+
+    lexicon = synthetic_lexicon(args.lexicon_size, args.seed)
+    texts = synthetic_corpus(args.rows, lexicon, args.mean_words, args.length_sigma,
+                             args.duplicate_rate, seed=args.seed)
+
+    print("=" * 78)
+    print(f"Corpus: {len(texts)} filas | ~{args.mean_words:.0f} palabras | "
+          f"duplicados {args.duplicate_rate:.0%} | léxico: {len(lexicon)} términos")
+    print("=" * 78)
+
+    single = bench_single_process(texts[:min(len(texts), 20000)], lexicon)
+    print(f"Un proceso: matcher {single['matcher_rows_per_second']:.0f} filas/s | "
+          f"subcadenas {single['substring_rows_per_second']:.0f} filas/s | "
+          f"aceleración x{single['speedup']:.1f}")
+
+    tmp_dir = tempfile.mkdtemp(prefix="bench_sentimiento_")
+    corpus_path = os.path.join(tmp_dir, "corpus.csv")
+    output_path = os.path.join(tmp_dir, "salida.csv")
+    with open(corpus_path, "w", encoding="utf-8") as f:
+        f.write("id,comentario\n")
+        for i, text in enumerate(texts):
+            f.write(f'{i},"{text}"\n')
+    del texts
+
+    print(f"{'procesos':>8s} {'chunk':>8s} {'filas/s':>10s} {'p50 ms':>8s} {'p95 ms':>8s} {'RSS MB':>8s}")
+    results = []
+    try:
+        for workers in args.workers:
+            for chunk_size in args.chunk_sizes:
+                r = bench_pipeline(corpus_path, output_path, lexicon, workers, chunk_size,
+                                   not args.no_cache)
+                results.append(r)
+                print(f"{workers:8d} {chunk_size:8d} {r['rows_per_second']:10.0f} "
+                      f"{r['chunk_p50_ms']:8.1f} {r['chunk_p95_ms']:8.1f} {r['peak_rss_mb']:8.1f}")
+    finally:
+        for path in (corpus_path, output_path):
+            if os.path.exists(path):
+                os.remove(path)
+        os.rmdir(tmp_dir)
+
+    best = recommend(results)
+    benchmark = {
+        'host': platform.node(),
+        'machine': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'python': platform.python_version(),
+        'config': {
+            'rows': args.rows,
+            'mean_words': args.mean_words,
+            'length_sigma': args.length_sigma,
+            'duplicate_rate': args.duplicate_rate,
+            'lexicon_size': len(lexicon),
+            'cache': not args.no_cache,
+            'seed': args.seed
+        },
+        'single_process': single,
+        'results': results,
+        'recommendation': {'workers': best['workers'], 'chunk_size': best['chunk_size'],
+                           'rows_per_second': best['rows_per_second']}
+    }
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        try:
+            comparison = compare_baseline(results, baseline, benchmark['config'])
+        except ValueError as e:
+            print(f"Aviso: {e}; no se compara")
+            comparison = []
+        benchmark['baseline'] = {'path': os.path.abspath(args.baseline),
+                                 'host': baseline.get('host'),
+                                 'comparison': comparison}
+        if baseline.get('host') != benchmark['host']:
+            print(f"Aviso: la línea base se midió en otro host ({baseline.get('host')})")
+        for c in comparison:
+            print(f"  {c['workers']:2d} procesos, chunk {c['chunk_size']:6d}: "
+                  f"x{c['ratio']:.2f} respecto a la línea base")
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(benchmark, f, indent=2)
+
+    print("=" * 78)
+    print(f"Recomendado para este host: {best['workers']} procesos, chunk de {best['chunk_size']} "
+          f"filas -> {best['rows_per_second']:.0f} filas/s")
+    print(f"Resultados: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Resultados persistentes del análisis, con re-puntuación incremental.
+
+Cada resultado se guarda en Parquet dentro de RESULTS_DIR junto con un
+manifiesto JSON. La clave es el hash del contenido del archivo subido, la
+columna de texto y la versión del léxico:
+
+  - si se vuelve a subir el mismo archivo, el resultado se reutiliza sin
+    leerlo de nuevo;
+  - si el archivo es uno anterior con filas añadidas al final (mismas
+    primeras N filas de texto), se reutilizan el sentimiento y el puntaje
+    de esas N filas y sólo se puntúan las nuevas. Las demás columnas se
+    toman siempre del archivo nuevo.
+
+La ruta por defecto se puede cambiar con la variable SENTIMENT_RESULTS_DIR.
+"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+from sentiment_parallel import (LEXICON, SCORE_CACHE, lexicon_version, detect_format,
+                                iter_chunks, chunk_texts, update_digest, score_file)
+
+RESULTS_DIR = os.environ.get("SENTIMENT_RESULTS_DIR",
+                             os.path.join(tempfile.gettempdir(), "sentiment_results"))
+READ_BLOCK = 1 << 20
+
+
+def content_hash(source):
+    """SHA-256 de una ruta o de un archivo abierto (que queda rebobinado)"""
+    h = hashlib.sha256()
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for block in iter(lambda: f.read(READ_BLOCK), b""):
+                h.update(block)
+    else:
+        source.seek(0)
+        for block in iter(lambda: source.read(READ_BLOCK), b""):
+            h.update(block)
+        source.seek(0)
+    return h.hexdigest()
+
+
+def prefix_digests(source, fmt, column, counts, chunk_size):
+    """Hash de los textos de las primeras n filas, para cada n de `counts`"""
+    targets = sorted(set(counts))
+    digests = {}
+    h = hashlib.blake2b(digest_size=16)
+    seen = 0
+    for chunk in iter_chunks(source, fmt, chunk_size, columns=[column]):
+        texts = chunk_texts(chunk, column)
+        while targets and targets[0] <= seen + len(texts):
+            cut = targets.pop(0) - seen
+            partial = h.copy()
+            update_digest(partial, texts[:cut])
+            digests[seen + cut] = partial.hexdigest()
+        update_digest(h, texts)
+        seen += len(texts)
+        if not targets:
+            break
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return digests
+
+
+class ResultStore:
+    """Directorio de resultados Parquet indexados por contenido"""
+    def __init__(self, directory=None):
+        self.directory = directory or RESULTS_DIR
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _key(self, file_hash, column, version):
+        data = f"{file_hash}:{column}:{version}".encode("utf-8")
+        return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    def _manifests(self):
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if os.path.exists(os.path.join(self.directory, manifest['result'])):
+                yield manifest
+
+    def _find_prefix(self, source, fmt, column, version, chunk_size):
+        """Manifiesto más largo cuyas filas son un prefijo de `source`"""
+        candidates = [m for m in self._manifests()
+                      if m['column'] == column and m['lexicon_version'] == version
+                      and m['format'] == fmt and m['rows']]
+        if not candidates:
+            return None
+        digests = prefix_digests(source, fmt, column, [m['rows'] for m in candidates], chunk_size)
+        matches = [m for m in candidates if digests.get(m['rows']) == m['rows_digest']]
+        return max(matches, key=lambda m: m['rows'], default=None)
+
+    def score(self, source, column="comentario", chunk_size=20000, workers=None,
+              lexicon=None, progress=None, cache=SCORE_CACHE, fmt=None):
+        """
+        Devuelve (ruta del resultado Parquet, estadísticas), puntuando sólo
+        lo que no se haya puntuado antes.
+        """
+        started = time.perf_counter()
+        lexicon = lexicon or LEXICON
+        version = lexicon_version(lexicon)
+        fmt = fmt or detect_format(getattr(source, "name", source))
+        file_hash = content_hash(source)
+        key = self._key(file_hash, column, version)
+        result = os.path.join(self.directory, f"{key}.parquet")
+        manifest_path = os.path.join(self.directory, f"{key}.json")
+
+        if os.path.exists(result) and os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = json.load(f)
+            return result, {'rows': manifest['rows'], 'rows_reused': manifest['rows'],
+                            'rows_scored': 0, 'stored': True,
+                            'seconds': time.perf_counter() - started}
+
+        previous = self._find_prefix(source, fmt, column, version, chunk_size)
+        tmp = f"{result}.tmp"
+        try:
+            stats = score_file(source, tmp, column, chunk_size, workers, lexicon, progress,
+                               cache, fmt=fmt, out_fmt="parquet",
+                               skip_rows=previous['rows'] if previous else 0,
+                               previous=(os.path.join(self.directory, previous['result'])
+                                         if previous else None))
+            os.replace(tmp, result)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+        manifest = {
+            'content_hash': file_hash,
+            'format': fmt,
+            'column': column,
+            'lexicon_version': version,
+            'rows': stats['rows'],
+            'rows_digest': stats['rows_digest'],
+            'result': os.path.basename(result),
+            'created': time.time()
+        }
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        stats['stored'] = False
+        stats['seconds'] = time.perf_counter() - started
+        return result, stats
+
+
+def export_csv(result, output, chunk_size=50000):
+    """Convierte un resultado Parquet a CSV por chunks, sin cargarlo entero en memoria"""
+    with open(output, "w", encoding="utf-8", newline="") as f:
+        header = True
+        for chunk in iter_chunks(result, "parquet", chunk_size):
+            chunk.to_csv(f, index=False, header=header)
+            header = False
+    return output
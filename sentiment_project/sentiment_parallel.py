@@ -0,0 +1,529 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import argparse
+import itertools
+import multiprocessing
+from collections import deque, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+LEXICON = {
+    "bueno": 1,
+    "genial": 1,
+    "excelente": 2,
+    "feliz": 1,
+    "contento": 1,
+
+    "malo": -1,
+    "terrible": -2,
+    "horrible": -2,
+    "triste": -1,
+    "enojado": -1,
+    "molesto": -1,
+}
+
+# Una palabra = secuencia de letras/dígitos (incluye acentos y ñ)
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Separa el texto en palabras en minúsculas (una sola pasada)"""
+    return TOKEN_RE.findall(text.lower())
+
+
+def normalize_text(text):
+    """
+    Forma canónica para agrupar duplicados: las palabras del texto en
+    minúsculas, sin puntuación ni emojis ("Excelente!" y "excelente" son
+    la misma clave). El matcher sólo mira esas palabras, así que el puntaje
+    es el mismo que el del texto original.
+    """
+    return " ".join(tokenize(text))
+
+
+def lexicon_version(lexicon):
+    """Huella del léxico: cambia si cambia cualquier término o valor"""
+    data = json.dumps(sorted(lexicon.items()), ensure_ascii=False).encode("utf-8")
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
+
+class LexiconMatcher:
+    """
+    Léxico compilado: encuentra todos los términos en una sola pasada.
+
+    Los términos de una palabra se buscan en un diccionario (O(1) por
+    palabra) y los de varias palabras ("no me gusta") en un índice por
+    primera palabra, probando primero el más largo. El costo es lineal en
+    la longitud del texto y no depende del tamaño del léxico, y sólo hay
+    coincidencias de palabras completas ("malo" no coincide en "malogrado").
+    """
+    def __init__(self, lexicon):
+        self.version = lexicon_version(lexicon)
+        self.words = {}
+        self.phrases = {}
+        for term, value in lexicon.items():
+            tokens = tuple(tokenize(term))
+            if not tokens:
+                continue
+            if len(tokens) == 1:
+                self.words[tokens[0]] = value
+            else:
+                self.phrases.setdefault(tokens[0], []).append((tokens, value))
+        for candidates in self.phrases.values():
+            candidates.sort(key=lambda c: -len(c[0]))
+
+    def __len__(self):
+        return len(self.words) + sum(len(c) for c in self.phrases.values())
+
+    def find(self, text):
+        """Lista de (término, valor) encontrados, sin solapamientos"""
+        tokens = tokenize(text)
+        matches = []
+        i = 0
+        n = len(tokens)
+        while i < n:
+            token = tokens[i]
+            for phrase, value in self.phrases.get(token, ()):
+                if tuple(tokens[i:i + len(phrase)]) == phrase:
+                    matches.append((" ".join(phrase), value))
+                    i += len(phrase)
+                    break
+            else:
+                value = self.words.get(token)
+                if value is not None:
+                    matches.append((token, value))
+                i += 1
+        return matches
+
+    def score(self, text):
+        """
+        Suma de los valores de los términos encontrados. Cada término cuenta
+        una sola vez aunque se repita, igual que el `if word in t` anterior.
+        """
+        if not self.phrases:
+            # Camino rápido: sólo palabras sueltas
+            get = self.words.get
+            return sum(get(token, 0) for token in set(tokenize(text)))
+        return sum(dict(self.find(text)).values())
+
+
+def load_lexicon(path):
+    """
+    Lee un léxico desde un archivo de texto: una entrada por línea con
+    el término y su valor separados por tabulación o coma.
+    """
+    lexicon = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            sep = "\t" if "\t" in line else ","
+            term, _, value = line.rpartition(sep)
+            # Cualquier número válido ("2", "-0.5", "1e-3"); entero si no tiene decimales
+            weight = float(value)
+            lexicon[term.strip()] = int(weight) if weight.is_integer() else weight
+    return lexicon
+
+
+DEFAULT_MATCHER = LexiconMatcher(LEXICON)
+
+
+def score_text_lexicon(text: str, matcher=None):
+    """
+    Analiza un texto usando un léxico básico.
+    Devuelve: (label, info)
+       label = 'positivo', 'negativo', 'neutro'
+       info = diccionario con el puntaje
+    """
+
+    score = (matcher or DEFAULT_MATCHER).score(text)
+
+    if score > 0:
+        return "positivo", {"score": score}
+    elif score < 0:
+        return "negativo", {"score": score}
+    else:
+        return "neutro", {"score": 0}
+
+class ScoreCache:
+    """
+    Caché LRU acotada de resultados (label, score).
+
+    La clave es el hash del texto tal cual llega junto con la versión del
+    léxico, así que un léxico distinto nunca reutiliza resultados viejos.
+    Se comparte entre subidas (y sesiones) de la app, por eso usa un lock.
+    El hash del texto crudo es barato; la normalización (regex) queda para
+    los procesos hijos.
+    """
+    def __init__(self, max_entries=200000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(text, version):
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        return version, digest
+
+    def get(self, key):
+        with self.lock:
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self.entries.move_to_end(key)
+            return result
+
+    def get_many(self, keys):
+        """Resultados de varias claves con una sola toma del lock (None si faltan)"""
+        with self.lock:
+            entries = self.entries
+            results = [entries.get(key) for key in keys]
+            for key, result in zip(keys, results):
+                if result is not None:
+                    entries.move_to_end(key)
+            found = sum(r is not None for r in results)
+            self.hits += found
+            self.misses += len(results) - found
+            return results
+
+    def put_many(self, items):
+        with self.lock:
+            for key, result in items:
+                self.entries[key] = result
+                self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def put(self, key, result):
+        with self.lock:
+            self.entries[key] = result
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def hit_rate(self):
+        with self.lock:
+            total = self.hits + self.misses
+            return self.hits / total if total else 0.0
+
+
+SCORE_CACHE = ScoreCache()
+
+
+def collapse_duplicates(texts, version, cache=None):
+    """
+    Agrupa textos idénticos (tal cual llegan) y consulta la caché.
+
+    Es lo único que hace el proceso principal por fila: un diccionario y
+    un hash por texto distinto. La normalización, que agrupa además las
+    variantes de mayúsculas y puntuación, la hacen los procesos hijos
+    (ver score_texts).
+
+    Devuelve (keys, known, missing): la clave de cada fila, los resultados
+    ya conocidos por clave y la lista de (clave, texto) únicos que hay que
+    puntuar.
+    """
+    unique = dict.fromkeys(texts)
+    unique_keys = [ScoreCache.key(text, version) for text in unique]
+    by_text = dict(zip(unique, unique_keys))
+    keys = [by_text[text] for text in texts]
+    results = cache.get_many(unique_keys) if cache is not None else [None] * len(unique_keys)
+    known = {}
+    missing = []
+    for text, key, result in zip(unique, unique_keys, results):
+        if result is None:
+            missing.append((key, text))
+        else:
+            known[key] = result
+    return keys, known, missing
+
+
+def score_texts(texts, matcher):
+    """
+    Puntúa textos distintos agrupando los que coinciden tras normalizar
+    ("Excelente!" y "excelente"): (labels, scores, textos normalizados distintos).
+    """
+    results = {}
+    labels = []
+    scores = []
+    for text in texts:
+        normalized = normalize_text(text)
+        result = results.get(normalized)
+        if result is None:
+            label, info = score_text_lexicon(normalized, matcher)
+            result = results[normalized] = (label, info["score"])
+        labels.append(result[0])
+        scores.append(result[1])
+    return labels, scores, len(results)
+
+
+def process_text_list(text_list, matcher=None, cache=SCORE_CACHE):
+    """
+    Recibe una lista de strings y regresa una lista de labels.
+    (No se usa en Streamlit pero está disponible por si haces pruebas)
+    Cada texto distinto se puntúa una sola vez.
+    """
+    matcher = matcher or DEFAULT_MATCHER
+    keys, known, missing = collapse_duplicates(text_list, matcher.version, cache)
+    labels, scores, _ = score_texts([text for _, text in missing], matcher)
+    for (key, _), label, score in zip(missing, labels, scores):
+        known[key] = (label, score)
+    if cache is not None:
+        cache.put_many((key, known[key]) for key, _ in missing)
+    return [known[key][0] for key in keys]
+
+
+# ==========================
+# Procesamiento de archivos por chunks en varios procesos
+# ==========================
+
+# Matcher de cada proceso hijo (se compila una vez en el initializer)
+_worker_matcher = None
+
+
+def _init_worker(lexicon):
+    global _worker_matcher
+    _worker_matcher = LexiconMatcher(lexicon)
+
+
+def _score_chunk(texts):
+    """Normaliza y puntúa una lista de textos en un proceso hijo (ver score_texts)"""
+    return score_texts(texts, _worker_matcher)
+
+
+def detect_format(name):
+    """'parquet' para .parquet/.pq, 'csv' en cualquier otro caso"""
+    return "parquet" if str(name).lower().endswith((".parquet", ".pq")) else "csv"
+
+
+def iter_chunks(source, fmt, chunk_size, columns=None):
+    """
+    Recorre `source` (ruta o archivo) en DataFrames de como mucho `chunk_size` filas.
+
+    Los CSV se leen con todas las columnas como texto para que la salida
+    conserve los valores tal cual; los Parquet por lotes de Arrow.
+    """
+    import pandas as pd  # sólo en el proceso principal; los hijos no lo necesitan
+
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_size, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_size, usecols=columns,
+                               dtype=str, keep_default_na=False)
+
+
+def chunk_texts(chunk, column):
+    if column not in chunk.columns:
+        raise ValueError(f"El archivo debe tener una columna llamada '{column}'.")
+    return chunk[column].fillna("").astype(str).tolist()
+
+
+def update_digest(hasher, texts):
+    """Hash acumulado de los textos, independiente de cómo se parten los chunks"""
+    if texts:
+        hasher.update(("\0".join(texts) + "\0").encode("utf-8"))
+
+
+def previous_results(path, chunk_size):
+    """(sentimiento, puntaje) fila a fila de un resultado anterior (sólo esas columnas)"""
+    for chunk in iter_chunks(path, detect_format(path), chunk_size,
+                             columns=["sentimiento", "puntaje"]):
+        yield from zip(chunk["sentimiento"].tolist(), chunk["puntaje"].astype(float).tolist())
+
+
+class ResultWriter:
+    """Escribe chunks de resultados a CSV o a Parquet (un row group por chunk)"""
+    def __init__(self, path, fmt=None):
+        self.fmt = fmt or detect_format(path)
+        self.path = path
+        self.file = None
+        self.writer = None
+        self.schema = None
+
+    def write(self, chunk):
+        if self.fmt == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self.writer is None:
+                schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                # El puntaje puede ser entero o decimal según el léxico
+                index = schema.get_field_index("puntaje")
+                if index >= 0:
+                    schema = schema.set(index, pa.field("puntaje", pa.float64()))
+                self.schema = schema
+                self.writer = pq.ParquetWriter(self.path, schema)
+            self.writer.write_table(pa.Table.from_pandas(chunk, schema=self.schema,
+                                                         preserve_index=False))
+        else:
+            header = self.file is None
+            if header:
+                self.file = open(self.path, "w", encoding="utf-8", newline="")
+            chunk.to_csv(self.file, index=False, header=header)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.file is not None:
+            self.file.close()
+
+
+def score_file(source, output, column="comentario", chunk_size=20000, workers=None,
+               lexicon=None, progress=None, cache=SCORE_CACHE, fmt=None, out_fmt=None,
+               skip_rows=0, previous=None, on_chunk=None):
+    """
+    Lee `source` (CSV o Parquet) por chunks de `chunk_size` filas, los puntúa
+    en un pool de procesos y va escribiendo el resultado en `output` (CSV o
+    Parquet según la extensión) en el orden original.
+
+    Como mucho hay 2 chunks por proceso en vuelo, así que la memoria no
+    depende del tamaño del archivo. `progress(filas)` se llama tras escribir
+    cada chunk y `on_chunk(filas, segundos)` tras escribir cada chunk
+    puntuado, con el tiempo desde que se envió al pool hasta que se escribió.
+    Devuelve un diccionario con estadísticas.
+
+    Las filas repetidas de un chunk se puntúan una sola vez y los textos que
+    ya están en `cache` (de este archivo o de subidas anteriores) no se
+    envían a los procesos.
+
+    Con `previous` (resultado ya calculado de las primeras `skip_rows` filas)
+    el sentimiento y el puntaje de esas filas se toman de `previous` y sólo
+    se puntúan las siguientes. Las demás columnas siempre salen de `source`,
+    así que un cambio en otra columna nunca devuelve valores viejos.
+    """
+    workers = workers or os.cpu_count() or 1
+    lexicon = lexicon or LEXICON
+    version = lexicon_version(lexicon)
+    fmt = fmt or detect_format(getattr(source, "name", source))
+    max_in_flight = 2 * workers
+    context = multiprocessing.get_context("spawn")
+    digest = hashlib.blake2b(digest_size=16)
+    writer = ResultWriter(output, out_fmt)
+    pending = deque()
+    rows = 0
+    chunks = 0
+    lookups = 0
+    distinct = 0
+    hits = 0
+    reused = 0
+    started = time.perf_counter()
+
+    def write_next():
+        nonlocal rows, chunks, distinct
+        chunk, keys, known, missing, future, submitted = pending.popleft()
+        labels, scores, scored = future.result() if future is not None else ((), (), 0)
+        distinct += scored
+        for (key, _), label, score in zip(missing, labels, scores):
+            known[key] = (label, score)
+        if cache is not None:
+            cache.put_many((key, known[key]) for key, _ in missing)
+        results = [known[key] for key in keys]
+        chunk["sentimiento"] = [r[0] for r in results]
+        chunk["puntaje"] = [r[1] for r in results]
+        writer.write(chunk)
+        rows += len(chunk)
+        chunks += 1
+        if on_chunk is not None:
+            on_chunk(len(chunk), time.perf_counter() - submitted)
+        if progress is not None:
+            progress(rows)
+
+    try:
+        # Filas ya puntuadas en un resultado anterior: se reutiliza sólo su puntaje
+        if previous is None:
+            skip_rows = 0
+        reused_results = previous_results(previous, chunk_size) if skip_rows else iter(())
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_worker,
+                                 initargs=(lexicon,)) as executor:
+            seen = 0
+            for chunk in iter_chunks(source, fmt, chunk_size):
+                texts = chunk_texts(chunk, column)
+                update_digest(digest, texts)
+                if seen < skip_rows:
+                    # Prefijo ya puntuado: columnas nuevas + sentimiento/puntaje anteriores.
+                    # Todavía no hay chunks pendientes, así que se escribe en orden.
+                    skip = min(skip_rows - seen, len(chunk))
+                    seen += len(chunk)
+                    head = chunk.iloc[:skip].copy()
+                    results = list(itertools.islice(reused_results, skip))
+                    head["sentimiento"] = [r[0] for r in results]
+                    head["puntaje"] = [r[1] for r in results]
+                    writer.write(head)
+                    reused += skip
+                    rows += skip
+                    if progress is not None:
+                        progress(rows)
+                    chunk = chunk.iloc[skip:].copy()
+                    texts = texts[skip:]
+                    if chunk.empty:
+                        continue
+                else:
+                    seen += len(chunk)
+                keys, known, missing = collapse_duplicates(texts, version, cache)
+                lookups += len(known) + len(missing)
+                hits += len(known)
+                submitted = time.perf_counter()
+                future = executor.submit(_score_chunk, [t for _, t in missing]) if missing else None
+                pending.append((chunk, keys, known, missing, future, submitted))
+                if len(pending) >= max_in_flight:
+                    write_next()
+            while pending:
+                write_next()
+    finally:
+        writer.close()
+
+    elapsed = time.perf_counter() - started
+    scored = rows - reused
+    return {
+        "rows": rows,
+        "rows_reused": reused,
+        "rows_scored": scored,
+        "rows_digest": digest.hexdigest(),
+        "chunks": chunks,
+        "workers": workers,
+        "unique_texts": hits + distinct,
+        "duplicates_collapsed": scored - hits - distinct,
+        "cache_hits": hits,
+        "cache_hit_rate": hits / lookups if lookups else 0.0,
+        "seconds": elapsed,
+        "rows_per_second": scored / elapsed if elapsed > 0 else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análisis de sentimiento de un CSV o Parquet en paralelo")
+    parser.add_argument("input", help="Archivo de entrada (.csv o .parquet)")
+    parser.add_argument("-o", "--output", default=None,
+                        help="Archivo de salida .csv o .parquet (por defecto <entrada>_sentimientos.csv)")
+    parser.add_argument("--column", default="comentario", help="Columna con el texto")
+    parser.add_argument("--chunk-size", type=int, default=20000, help="Filas por chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Número de procesos")
+    parser.add_argument("--lexicon", default=None, help="Archivo de léxico (termino<TAB>valor)")
+    args = parser.parse_args()
+
+    base, _ = os.path.splitext(args.input)
+    output = args.output or f"{base}_sentimientos.csv"
+    lexicon = load_lexicon(args.lexicon) if args.lexicon else None
+
+    stats = score_file(args.input, output, args.column, args.chunk_size, args.workers, lexicon)
+    print(f"Filas: {stats['rows']} en {stats['chunks']} chunks | {stats['workers']} procesos | "
+          f"{stats['seconds']:.2f} s ({stats['rows_per_second']:.0f} filas/s)")
+    print(f"Textos distintos: {stats['unique_texts']} ({stats['duplicates_collapsed']} duplicados "
+          f"agrupados) | aciertos de caché: {stats['cache_hits']} ({stats['cache_hit_rate']:.1%})")
+    print(f"Resultados: {output}")
+
+
+if __name__ == "__main__":
+    main()